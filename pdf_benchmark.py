@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Splitter Benchmark
+Measures split and merge throughput on synthetic PDF files
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+import pypdf
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+from pdf_splitter import PDFSplitter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_SIZES = [10, 1000, 10000, 50000]
+DEFAULT_CHUNK_SIZES = [10, 100, 1000]
+DEFAULT_KINDS = ['text', 'image']
+
+
+def generate_pdf(output_file: str, pages: int, kind: str = 'text', shared_fonts: bool = True) -> None:
+    """
+    Generates a synthetic PDF file
+    
+    Args:
+        output_file: Path to the generated file
+        pages: Number of pages
+        kind: 'text' for text-only pages, 'image' for pages with an image each
+        shared_fonts: Reference one font object from all pages instead of one per page
+    """
+    writer = pypdf.PdfWriter()
+    
+    def font_object():
+        return writer._add_object(DictionaryObject({
+            NameObject('/Type'): NameObject('/Font'),
+            NameObject('/Subtype'): NameObject('/Type1'),
+            NameObject('/BaseFont'): NameObject('/Helvetica'),
+        }))
+    
+    font = font_object()
+    for page_num in range(pages):
+        page = writer.add_blank_page(612, 792)
+        if not shared_fonts:
+            font = font_object()
+        resources = DictionaryObject({
+            NameObject('/Font'): DictionaryObject({NameObject('/F1'): font}),
+        })
+        
+        # Forty lines of text per page
+        lines = [f"BT /F1 11 Tf 72 {740 - line * 16} Td (Page {page_num + 1} line {line + 1} "
+                 f"of synthetic benchmark text) Tj ET" for line in range(40)]
+        
+        if kind == 'image':
+            # Every page gets its own image, as scans do
+            image = DecodedStreamObject()
+            image.set_data(bytes((page_num + x) % 256 for x in range(256 * 3)) * 256)
+            image.update({
+                NameObject('/Type'): NameObject('/XObject'),
+                NameObject('/Subtype'): NameObject('/Image'),
+                NameObject('/Width'): NumberObject(256),
+                NameObject('/Height'): NumberObject(256),
+                NameObject('/ColorSpace'): NameObject('/DeviceRGB'),
+                NameObject('/BitsPerComponent'): NumberObject(8),
+            })
+            resources[NameObject('/XObject')] = DictionaryObject({
+                NameObject('/Im1'): writer._add_object(image.flate_encode()),
+            })
+            lines.append("q 256 0 0 256 178 100 cm /Im1 Do Q")
+        
+        content = DecodedStreamObject()
+        content.set_data("\n".join(lines).encode())
+        page[NameObject('/Contents')] = writer._add_object(content)
+        page[NameObject('/Resources')] = resources
+    
+    with open(output_file, 'wb') as file:
+        writer.write(file)
+
+
+def peak_rss_mb():
+    """Returns peak resident memory of the current process in MB (None where unavailable)"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def _discard_message(message: str) -> None:
+    """Swallows operation messages so that they do not affect timings"""
+
+
+def run_case(operation: str, input_path: str, chunk_size: int, work_dir: str) -> dict:
+    """
+    Times one split or merge run, meant to be executed in a fresh process
+    
+    Returns:
+        dict: Elapsed seconds, success flag and peak resident memory of the process
+    """
+    splitter = PDFSplitter(log=_discard_message)
+    started = time.perf_counter()
+    if operation == 'split':
+        success = splitter.split_pdf(input_path, chunk_size, output_dir=work_dir)
+    else:
+        success = splitter.merge_pdfs(input_path, os.path.join(work_dir, 'merged.pdf'))
+    return {
+        'seconds': time.perf_counter() - started,
+        'success': success,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def measure(operation: str, input_path: str, input_bytes: int, pages: int,
+            chunk_size: int, work_dir: str) -> dict:
+    """Runs one case in its own process so that peak memory belongs to this case only"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(run_case, operation, input_path, chunk_size, work_dir).result()
+    seconds = max(result['seconds'], 1e-9)
+    return {
+        'seconds': round(seconds, 4),
+        'success': result['success'],
+        'pages_per_sec': round(pages / seconds, 1),
+        'mb_per_sec': round(input_bytes / (1024 * 1024) / seconds, 2),
+        'peak_rss_mb': result['peak_rss_mb'],
+    }
+
+
+def run_benchmarks(sizes: List[int], chunk_sizes: List[int], kinds: List[str], work_dir: str) -> List[dict]:
+    """
+    Generates the corpus and measures split and merge for every combination
+    
+    Returns:
+        List[dict]: One result per case
+    """
+    results = []
+    for kind in kinds:
+        for shared_fonts in (True, False):
+            for pages in sizes:
+                fonts = 'shared' if shared_fonts else 'per-page'
+                source = os.path.join(work_dir, f"{kind}_{fonts}_{pages}.pdf")
+                print(f"Generating {source}")
+                generate_pdf(source, pages, kind, shared_fonts)
+                source_bytes = os.path.getsize(source)
+                
+                for chunk_size in chunk_sizes:
+                    if chunk_size > pages:
+                        continue
+                    chunks_dir = os.path.join(work_dir, 'chunks')
+                    merged_dir = os.path.join(work_dir, 'merged')
+                    os.makedirs(merged_dir, exist_ok=True)
+                    
+                    for operation in ('split', 'merge'):
+                        name = f"{operation}/{kind}/{fonts}/{pages}/{chunk_size}"
+                        if operation == 'split':
+                            result = measure('split', source, source_bytes, pages, chunk_size, chunks_dir)
+                        else:
+                            chunks_bytes = sum(entry.stat().st_size for entry in os.scandir(chunks_dir))
+                            result = measure('merge', chunks_dir, chunks_bytes, pages, chunk_size, merged_dir)
+                        result.update({'name': name, 'operation': operation, 'kind': kind,
+                                       'shared_fonts': shared_fonts, 'pages': pages,
+                                       'chunk_size': chunk_size})
+                        results.append(result)
+                        print(f"  {name}: {result['seconds']:.3f} s, {result['pages_per_sec']} pages/s, "
+                              f"{result['mb_per_sec']} MB/s, peak RSS {result['peak_rss_mb']} MB")
+                    
+                    shutil.rmtree(chunks_dir, ignore_errors=True)
+                    shutil.rmtree(merged_dir, ignore_errors=True)
+                os.remove(source)
+    return results
+
+
+def compare_with_baseline(results: List[dict], baseline: List[dict], threshold: float) -> List[str]:
+    """
+    Compares timings with a stored baseline
+    
+    Args:
+        results: Current results
+        baseline: Results of a previous run
+        threshold: Allowed slowdown as a fraction (0.2 = 20% slower)
+    
+    Returns:
+        List[str]: Descriptions of cases slower than the threshold
+    """
+    baseline_by_name = {case['name']: case for case in baseline}
+    regressions = []
+    for case in results:
+        base = baseline_by_name.get(case['name'])
+        if not base or not base.get('seconds'):
+            continue
+        slowdown = case['seconds'] / base['seconds'] - 1
+        if slowdown > threshold:
+            regressions.append(f"{case['name']}: {base['seconds']:.3f} s -> {case['seconds']:.3f} s "
+                               f"({slowdown * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    """Main function of the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark split and merge throughput")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Page counts of generated files")
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=DEFAULT_CHUNK_SIZES, help="Pages per split file")
+    parser.add_argument('--kinds', nargs='+', choices=DEFAULT_KINDS, default=DEFAULT_KINDS, help="Page content kinds")
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help="Path to the results JSON file")
+    parser.add_argument('--baseline', help="Results JSON file of a previous run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown against the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix='pdf_benchmark_')
+    try:
+        results = run_benchmarks(args.sizes, args.chunk_sizes, args.kinds, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    report = {
+        'python': sys.version.split()[0],
+        'pypdf': pypdf.__version__,
+        'cases': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults saved to: {args.output}")
+    
+    exit_code = 0 if all(case['success'] for case in results) else 1
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)['cases']
+        regressions = compare_with_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"Slower than baseline by more than {args.threshold * 100:.0f}%:")
+            for line in regressions:
+                print(f"  {line}")
+            exit_code = 1
+        else:
+            print("No regressions against baseline")
+    
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Page Deduplication
+Fingerprints of merge input pages and the index finding pages repeated across inputs
+"""
+
+import hashlib
+from typing import Dict, List, Optional, Tuple
+import pypdf
+
+from pdf_fingerprint import ObjectFingerprinter
+
+
+# Deduplication modes of a merge:
+#   report - merge every page and list the pages repeated across inputs
+#   skip   - leave out pages already merged from an earlier input
+DEDUP_MODES = ('report', 'skip')
+
+# Page attributes that change how a page looks besides its content and resources
+PAGE_ATTRIBUTES = ('/MediaBox', '/CropBox', '/Rotate')
+
+# Fingerprints of pypdf objects
+_fingerprinter = ObjectFingerprinter(pypdf.generic)
+
+
+def check_dedup_mode(mode: Optional[str]) -> Optional[str]:
+    """
+    Checks a deduplication mode, None or "" meaning no deduplication
+    
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if not mode:
+        return None
+    mode = mode.strip().lower()
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown deduplication mode {mode!r} (expected {', '.join(DEDUP_MODES)})")
+    return mode
+
+
+def _content_data(page: pypdf.PageObject) -> bytes:
+    """
+    Returns the normalised content of a page
+    
+    Content streams are decoded and joined, with surrounding whitespace dropped,
+    so one stream, an array of streams and differently compressed copies of the
+    same operators give the same bytes.
+    """
+    contents = page.get('/Contents')
+    if contents is None:
+        return b""
+    contents = contents.get_object()
+    streams = contents if _fingerprinter.kind(contents) == 'array' else [contents]
+    parts = []
+    for stream in streams:
+        stream = stream.get_object()
+        if _fingerprinter.kind(stream) != 'stream':
+            continue
+        try:
+            data = stream.get_data()
+        except Exception:
+            # Undecodable data is still compared as stored
+            data = stream._data or b""
+        parts.append(data.strip())
+    return b"\n".join(parts)
+
+
+def page_fingerprints(reader: pypdf.PdfReader) -> List[bytes]:
+    """
+    Computes a fingerprint of every page from its normalised content, resources and geometry
+    
+    Returns:
+        List[bytes]: Fingerprints in page order
+    """
+    memo: Dict[int, bytes] = {}
+    fingerprints = []
+    for page in reader.pages:
+        digest = hashlib.sha1(_content_data(page))
+        # pypdf copies inherited resources and boxes into every page
+        digest.update(_fingerprinter.fingerprint(page.raw_get('/Resources') if '/Resources' in page else None,
+                                                 memo))
+        for key in PAGE_ATTRIBUTES:
+            if key in page:
+                digest.update(key.encode())
+                digest.update(_fingerprinter.fingerprint(page.raw_get(key), memo))
+        fingerprints.append(digest.digest())
+    return fingerprints
+
+
+class PageIndex:
+    """
+    Index of the pages merged so far, finding pages that repeat an earlier input
+    
+    A page is a duplicate if a page with the same fingerprint came from another
+    input; pages repeated inside one file are kept. For inputs named by page
+    range the source page number is part of the key, so pages that only look
+    alike, such as blank pages at different positions, are not taken for
+    duplicates. Without ranges in the names any identical page counts.
+    
+    Attributes:
+        mode: One of DEDUP_MODES
+        ranges: Page range by file name for inputs named by page range
+        pages: Number of pages checked
+        duplicates: (file, page, first file, first page) of every duplicate, pages 1-based
+    """
+    
+    def __init__(self, mode: str = 'report', ranges: Dict[str, Tuple[int, int]] = None):
+        self.mode = mode
+        self.ranges = ranges or {}
+        self.first: Dict[tuple, Tuple[str, int]] = {}
+        self.pages = 0
+        self.duplicates: List[Tuple[str, int, str, int]] = []
+    
+    def check(self, file_name: str, reader: pypdf.PdfReader) -> List[int]:
+        """
+        Fingerprints the pages of an input and records them
+        
+        Args:
+            file_name: Name of the input in merge order
+            reader: Reader of the input
+        
+        Returns:
+            List[int]: Indexes (0-based) of the pages that duplicate pages of earlier inputs
+        """
+        first_page = self.ranges[file_name][0] if file_name in self.ranges else None
+        repeated = []
+        for index, fingerprint in enumerate(page_fingerprints(reader)):
+            key = (None if first_page is None else first_page + index, fingerprint)
+            first = self.first.setdefault(key, (file_name, index + 1))
+            if first[0] != file_name:
+                repeated.append(index)
+                self.duplicates.append((file_name, index + 1) + first)
+        self.pages += len(reader.pages)
+        return repeated
+    
+    def runs(self) -> List[Tuple[str, int, int, str, int]]:
+        """
+        Groups duplicates into runs of consecutive pages repeating consecutive pages of one file
+        
+        Returns:
+            List[tuple]: (file, first page, last page, first file, its first page) per run
+        """
+        runs = []
+        for file_name, page, first_file, first_page in self.duplicates:
+            if runs:
+                last = runs[-1]
+                if (last[0] == file_name and last[2] + 1 == page and last[3] == first_file
+                        and last[4] + page - last[1] == first_page):
+                    runs[-1] = last[:2] + (page,) + last[3:]
+                    continue
+            runs.append((file_name, page, page, first_file, first_page))
+        return runs
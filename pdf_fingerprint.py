@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Object Fingerprints
+Content fingerprints of PDF objects for PyPDF2 and pypdf readers
+"""
+
+import hashlib
+from typing import Dict, List
+
+
+# Keys that say nothing about an object's content: the stream length follows
+# from the data and parent links point back up the page tree
+FINGERPRINT_IGNORED_KEYS = ('/Length', '/Parent', '/StructParents')
+
+
+class ObjectFingerprinter:
+    """
+    Computes content fingerprints of the objects of one PDF library
+    
+    Two objects with equal fingerprints are byte-identical after resolving
+    indirect references, so one may be used in place of the other. Streams are
+    hashed as stored, without decoding, and every indirect object once per memo,
+    so fonts and images shared by many pages cost nothing after the first page.
+    
+    The kind of an object is looked up by its class: isinstance() on pypdf
+    classes goes through a typing Protocol check, which would dominate the time.
+    """
+    
+    def __init__(self, generic):
+        """
+        Args:
+            generic: The library's generic module (PyPDF2.generic or pypdf.generic)
+        """
+        self.classes = (('reference', generic.IndirectObject), ('stream', generic.StreamObject),
+                        ('dictionary', generic.DictionaryObject), ('array', generic.ArrayObject))
+        self.kinds: Dict[type, str] = {}
+    
+    def kind(self, obj) -> str:
+        """Returns 'reference', 'stream', 'dictionary', 'array' or 'value'"""
+        cls = type(obj)
+        kind = self.kinds.get(cls)
+        if kind is None:
+            kind = next((name for name, base in self.classes if issubclass(cls, base)), 'value')
+            self.kinds[cls] = kind
+        return kind
+    
+    def fingerprint(self, obj, memo: Dict[int, bytes], visiting: set = None) -> bytes:
+        """
+        Computes the fingerprint of an object including everything it references
+        
+        Args:
+            obj: Object to fingerprint
+            memo: Fingerprints of indirect objects by object number, shared by the calls
+                  for one reader
+            visiting: Object numbers being fingerprinted, to break reference cycles
+        """
+        parts = []
+        self._collect(obj, parts, memo, set() if visiting is None else visiting)
+        return hashlib.sha1(b"".join(parts)).digest()
+    
+    def _collect(self, obj, parts: List[bytes], memo: Dict[int, bytes], visiting: set) -> None:
+        """Appends the bytes an object is fingerprinted from, referenced objects by their fingerprint"""
+        kind = self.kind(obj)
+        if kind == 'reference':
+            fingerprint = memo.get(obj.idnum)
+            if fingerprint is None:
+                if obj.idnum in visiting:
+                    # Reference cycle: fall back to identity of the object
+                    parts.append(f"R{obj.idnum}".encode())
+                    return
+                visiting.add(obj.idnum)
+                try:
+                    fingerprint = memo[obj.idnum] = self.fingerprint(obj.get_object(), memo, visiting)
+                finally:
+                    visiting.discard(obj.idnum)
+            parts.append(fingerprint)
+        elif kind == 'stream' or kind == 'dictionary':
+            parts.append(b"<<")
+            for key in sorted(obj.keys()):
+                if key in FINGERPRINT_IGNORED_KEYS:
+                    continue
+                parts.append(key.encode('utf-8', 'replace'))
+                self._collect(obj.raw_get(key), parts, memo, visiting)
+            parts.append(b">>")
+            if kind == 'stream':
+                parts.append(obj._data or b"")
+        elif kind == 'array':
+            parts.append(b"[")
+            for item in obj:
+                self._collect(item, parts, memo, visiting)
+            parts.append(b"]")
+        else:
+            parts.append(repr(obj).encode('utf-8', 'replace'))
+            parts.append(b" ")
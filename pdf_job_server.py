@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Job Server
+Local HTTP service running split and merge jobs on a bounded process pool
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import asyncio
+import argparse
+import itertools
+import threading
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+from urllib.parse import urlsplit, parse_qs
+
+from pdf_splitter import run_job
+
+
+DEFAULT_PORT = 8765
+# Largest accepted request body (job descriptions are small JSON objects)
+MAX_BODY_BYTES = 1024 * 1024
+# Size of chunks sent when streaming results
+STREAM_CHUNK_BYTES = 256 * 1024
+# Finished jobs kept for status queries before the oldest are forgotten
+MAX_FINISHED_JOBS = 1000
+
+STATUS_TEXT = {
+    200: 'OK',
+    202: 'Accepted',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    413: 'Payload Too Large',
+    503: 'Service Unavailable',
+}
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+
+def _run_server_job(job: dict, job_id: str, progress, cancel_event) -> dict:
+    """Process pool entry point: runs a job and publishes its progress in the shared dict"""
+    def report(info):
+        progress[job_id] = info
+    return run_job(job, progress_callback=report, cancel_event=cancel_event)
+
+
+class _Job:
+    """State of one submitted job"""
+    
+    def __init__(self, spec: dict, priority: int, cancel_event):
+        self.id = uuid.uuid4().hex
+        self.spec = spec
+        self.priority = priority
+        self.cancel_event = cancel_event
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+    
+    def describe(self, progress: dict = None) -> dict:
+        """Returns the job status as sent to clients"""
+        return {
+            'id': self.id,
+            'operation': self.spec.get('operation'),
+            'input': self.spec.get('input'),
+            'priority': self.priority,
+            'status': self.status,
+            'progress': progress,
+            'result': self.result,
+            'error': self.error,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class _QueueWriter:
+    """File-like object handing written bytes from a thread to the event loop through a bounded queue"""
+    
+    def __init__(self, max_chunks: int = 8):
+        self.chunks = queue.Queue(maxsize=max_chunks)
+        self.closed = False
+    
+    def write(self, data: bytes) -> int:
+        # An empty chunk would end the chunked response early
+        if not data:
+            return 0
+        # Blocks while the client is slower than the archive is produced
+        while not self.closed:
+            try:
+                self.chunks.put(bytes(data), timeout=1)
+                return len(data)
+            except queue.Full:
+                continue
+        raise OSError("client disconnected")
+    
+    def flush(self) -> None:
+        pass
+
+
+def _write_archive(output_dir: str, files: List[str], writer: _QueueWriter) -> None:
+    """Writes split output files into a ZIP archive on the queue writer, ending with None"""
+    try:
+        with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for file_name in files:
+                archive.write(os.path.join(output_dir, file_name), file_name)
+        writer.chunks.put(None)
+    except Exception as e:
+        if not writer.closed:
+            writer.chunks.put(e)
+
+
+class JobServer:
+    """
+    Accepts split and merge jobs over HTTP and runs them on a process pool
+    
+    Endpoints:
+        POST /jobs                  submit a job (JSON, same fields as a batch manifest
+                                    line plus optional "priority", lower runs first)
+        GET  /jobs                  list jobs
+        GET  /jobs/<id>             job status and progress
+        POST /jobs/<id>/cancel      cancel a queued or running job (also DELETE /jobs/<id>)
+        GET  /jobs/<id>/result      merged PDF, or ZIP archive of split files;
+                                    ?format=path returns output paths instead
+        GET  /health                queue and pool state
+    
+    When max_queue jobs are waiting, new submissions get 503 with Retry-After.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, workers: int = 2,
+                 max_queue: int = 16, log=print):
+        self.host = host
+        self.port = port
+        self.workers = max(workers, 1)
+        self.max_queue = max(max_queue, 1)
+        self.log = log
+        self.jobs = {}
+        self.sequence = itertools.count()
+        self.queue = None
+        self.executor = None
+        self.manager = None
+        self.progress = None
+    
+    async def serve(self) -> None:
+        """Starts the pool and the HTTP listener and serves until cancelled"""
+        self.manager = multiprocessing.Manager()
+        self.progress = self.manager.dict()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        runners = [asyncio.create_task(self._run_jobs()) for _ in range(self.workers)]
+        try:
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+            self.log(f"PDF job server listening on http://{self.host}:{self.port} "
+                     f"({self.workers} workers, queue of {self.max_queue})")
+            async with server:
+                await server.serve_forever()
+        finally:
+            for runner in runners:
+                runner.cancel()
+            for job in self.jobs.values():
+                if job.status == 'running':
+                    job.cancel_event.set()
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.manager.shutdown()
+    
+    async def _run_jobs(self) -> None:
+        """Takes jobs from the queue in priority order and runs them on the pool"""
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, job = await self.queue.get()
+            if job.status == 'cancelled':
+                continue
+            
+            job.status = 'running'
+            job.started = time.time()
+            try:
+                job.result = await loop.run_in_executor(self.executor, _run_server_job, job.spec,
+                                                        job.id, self.progress, job.cancel_event)
+                if job.status == 'cancelling':
+                    job.status = 'cancelled'
+                else:
+                    job.status = 'done' if job.result['success'] else 'failed'
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+            job.finished = time.time()
+            self.log(f"Job {job.id} {job.status}")
+            self._forget_old_jobs()
+    
+    def _forget_old_jobs(self) -> None:
+        """Drops the oldest finished jobs above MAX_FINISHED_JOBS"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job_id]
+            self.progress.pop(job_id, None)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reads one HTTP request and answers it"""
+        try:
+            request_line = await reader.readline()
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            
+            length = int(headers.get('content-length') or 0)
+            if length > MAX_BODY_BYTES:
+                await self._send_json(writer, 413, {'error': "Request body too large"})
+                return
+            body = await reader.readexactly(length) if length else b''
+            await self._route(method, target, body, writer)
+        except (ValueError, asyncio.IncompleteReadError):
+            await self._send_json(writer, 400, {'error': "Malformed request"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def _route(self, method: str, target: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        """Dispatches a request to its endpoint"""
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+        
+        if parts == ['health'] and method == 'GET':
+            running = sum(1 for job in self.jobs.values() if job.status in ('running', 'cancelling'))
+            await self._send_json(writer, 200, {'status': 'ok', 'queued': self.queue.qsize(),
+                                                'max_queue': self.max_queue, 'running': running,
+                                                'workers': self.workers})
+        elif parts == ['jobs'] and method == 'POST':
+            await self._submit(body, writer)
+        elif parts == ['jobs'] and method == 'GET':
+            await self._send_json(writer, 200, {'jobs': [self._describe(job) for job in self.jobs.values()]})
+        elif len(parts) >= 2 and parts[0] == 'jobs':
+            job = self.jobs.get(parts[1])
+            if job is None:
+                await self._send_json(writer, 404, {'error': f"Unknown job {parts[1]}"})
+            elif len(parts) == 2 and method == 'GET':
+                await self._send_json(writer, 200, self._describe(job))
+            elif (parts[2:] == ['cancel'] and method == 'POST') or (len(parts) == 2 and method == 'DELETE'):
+                self._cancel(job)
+                await self._send_json(writer, 200, self._describe(job))
+            elif parts[2:] == ['result'] and method == 'GET':
+                await self._send_result(job, query.get('format', [None])[0], writer)
+            else:
+                await self._send_json(writer, 405, {'error': "Method not allowed"})
+        else:
+            await self._send_json(writer, 404, {'error': f"Unknown endpoint {url.path}"})
+    
+    def _describe(self, job: _Job) -> dict:
+        """Job status with its latest progress report"""
+        return job.describe(self.progress.get(job.id))
+    
+    async def _submit(self, body: bytes, writer: asyncio.StreamWriter) -> None:
+        """Validates a job description and queues it"""
+        try:
+            spec = json.loads(body or b'{}')
+        except ValueError:
+            await self._send_json(writer, 400, {'error': "Body must be a JSON object"})
+            return
+        if not isinstance(spec, dict) or spec.get('operation') not in ('split', 'merge'):
+            await self._send_json(writer, 400, {'error': "Field 'operation' must be 'split' or 'merge'"})
+            return
+        if not isinstance(spec.get('input'), str) or not os.path.exists(spec['input']):
+            await self._send_json(writer, 400, {'error': f"Input {spec.get('input')!r} not found"})
+            return
+        
+        try:
+            priority = int(spec.pop('priority', 0))
+        except (TypeError, ValueError):
+            await self._send_json(writer, 400, {'error': "Field 'priority' must be an integer"})
+            return
+        
+        job = _Job(spec, priority, self.manager.Event())
+        try:
+            self.queue.put_nowait((priority, next(self.sequence), job))
+        except asyncio.QueueFull:
+            await self._send_json(writer, 503, {'error': "Job queue is full, retry later"},
+                                  {'Retry-After': '5'})
+            return
+        
+        self.jobs[job.id] = job
+        self.log(f"Job {job.id} queued: {spec['operation']} {spec['input']}")
+        await self._send_json(writer, 202, self._describe(job), {'Location': f"/jobs/{job.id}"})
+    
+    def _cancel(self, job: _Job) -> None:
+        """Cancels a queued job right away, a running one through its cancel event"""
+        if job.status == 'queued':
+            job.status = 'cancelled'
+            job.finished = time.time()
+        elif job.status == 'running':
+            job.status = 'cancelling'
+            job.cancel_event.set()
+    
+    async def _send_result(self, job: _Job, result_format: str, writer: asyncio.StreamWriter) -> None:
+        """Sends the output of a finished job as a file, an archive or its paths"""
+        if job.status != 'done':
+            await self._send_json(writer, 409, {'error': f"Job is {job.status}", 'status': job.status})
+            return
+        
+        output = job.result.get('output')
+        if result_format == 'path':
+            files = sorted(os.listdir(output)) if os.path.isdir(output) else []
+            await self._send_json(writer, 200, {'output': output, 'files': files})
+        elif os.path.isdir(output):
+            await self._send_archive(output, writer)
+        elif os.path.isfile(output):
+            await self._send_file(output, writer)
+        else:
+            await self._send_json(writer, 404, {'error': f"Output {output} no longer exists"})
+    
+    async def _send_file(self, file_path: str, writer: asyncio.StreamWriter) -> None:
+        """Streams a file in chunks"""
+        loop = asyncio.get_running_loop()
+        self._write_head(writer, 200, {
+            'Content-Type': 'application/pdf',
+            'Content-Length': str(os.path.getsize(file_path)),
+            'Content-Disposition': f'attachment; filename="{os.path.basename(file_path)}"',
+        })
+        with open(file_path, 'rb') as file:
+            while True:
+                chunk = await loop.run_in_executor(None, file.read, STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+    
+    async def _send_archive(self, output_dir: str, writer: asyncio.StreamWriter) -> None:
+        """Streams the PDF files of a folder as a ZIP archive built while it is sent"""
+        loop = asyncio.get_running_loop()
+        files = sorted(file for file in os.listdir(output_dir) if file.lower().endswith('.pdf'))
+        self._write_head(writer, 200, {
+            'Content-Type': 'application/zip',
+            'Transfer-Encoding': 'chunked',
+            'Content-Disposition': f'attachment; filename="{os.path.basename(output_dir)}.zip"',
+        })
+        
+        archive_writer = _QueueWriter()
+        producer = threading.Thread(target=_write_archive, args=(output_dir, files, archive_writer), daemon=True)
+        producer.start()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, archive_writer.chunks.get)
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    # Headers are sent already, an unterminated body tells the client it failed
+                    self.log(f"Error archiving {output_dir}: {str(chunk)}")
+                    return
+                writer.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            archive_writer.closed = True
+    
+    def _write_head(self, writer: asyncio.StreamWriter, status: int, headers: dict) -> None:
+        """Writes the status line and headers of a response"""
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", "Connection: close"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+    
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict,
+                         headers: dict = None) -> None:
+        """Sends a JSON response"""
+        body = json.dumps(payload).encode('utf-8')
+        self._write_head(writer, status, dict({'Content-Type': 'application/json',
+                                               'Content-Length': str(len(body))}, **(headers or {})))
+        writer.write(body)
+        await writer.drain()
+
+
+def main():
+    """Main function of the job server"""
+    parser = argparse.ArgumentParser(description="Local HTTP server for split and merge jobs")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument('-w', '--workers', type=int, default=2, help="Number of worker processes")
+    parser.add_argument('--max-queue', type=int, default=16, help="Number of waiting jobs accepted")
+    args = parser.parse_args()
+    
+    server = JobServer(args.host, args.port, args.workers, args.max_queue)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Merge Plan
+Orders the input files of a merge and validates the order before any PDF is opened
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# File names written by the split: "{start}-{end}.pdf" (anything may follow the range)
+RANGE_PATTERN = re.compile(r'^(\d+)-(\d+)')
+
+# Merge orders:
+#   auto     - ranges if every file name starts with a page range, natural otherwise
+#   ranges   - by page range, failing on files without one, overlaps and gaps
+#   natural  - by name, with digit runs compared as numbers ("page2" before "page10")
+#   mtime    - by modification time, oldest first (folders only)
+#   manifest - in the order of the names listed in a manifest file
+MERGE_ORDERS = ('auto', 'ranges', 'natural', 'mtime', 'manifest')
+
+# File names quoted in one error message
+MAX_NAMES_REPORTED = 5
+
+
+class PlanError(Exception):
+    """Raised when the input files cannot be put in a valid merge order"""
+
+
+def natural_key(name: str) -> list:
+    """Sort key comparing digit runs of a name as numbers and the rest case-insensitively"""
+    # Splitting on a captured group alternates text and digits, so positions always compare alike
+    parts = re.split(r'(\d+)', name)
+    return [int(part) if index % 2 else part.lower() for index, part in enumerate(parts)]
+
+
+def page_range(name: str) -> Optional[Tuple[int, int]]:
+    """Returns the (start, end) page range a file name starts with, None if it has none"""
+    match = RANGE_PATTERN.match(os.path.basename(name))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def scan_folder(input_dir: str, suffix: str = '.pdf') -> Dict[str, int]:
+    """
+    Lists the files of a folder with their modification times in one pass
+    
+    Returns:
+        Dict[str, int]: Modification time in nanoseconds by file name
+    """
+    files = {}
+    with os.scandir(input_dir) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(suffix) and entry.is_file():
+                files[entry.name] = entry.stat().st_mtime_ns
+    return files
+
+
+def read_manifest(manifest_file: str) -> List[str]:
+    """
+    Reads a merge manifest: one file name per line, blank lines and lines starting with # ignored
+    
+    Raises:
+        PlanError: If the manifest cannot be read
+    """
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as file:
+            lines = [line.strip() for line in file]
+    except OSError as e:
+        raise PlanError(f"Cannot read manifest {manifest_file}: {str(e)}")
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+def _quote(names: List[str]) -> str:
+    quoted = ", ".join(names[:MAX_NAMES_REPORTED])
+    if len(names) > MAX_NAMES_REPORTED:
+        quoted += f" and {len(names) - MAX_NAMES_REPORTED} more"
+    return quoted
+
+
+class MergePlan:
+    """
+    Input files of a merge in merge order
+    
+    Attributes:
+        files: File names in merge order
+        order: Order used (auto resolves to ranges or natural)
+        ranges: Page range by file name for files named by page range
+        warnings: Problems that do not stop the merge
+    """
+    
+    def __init__(self, files: List[str], order: str, ranges: Dict[str, Tuple[int, int]] = None,
+                 warnings: List[str] = None):
+        self.files = files
+        self.order = order
+        self.ranges = ranges or {}
+        self.warnings = warnings or []
+
+
+def build_merge_plan(names, order: str = 'auto', mtimes: Dict[str, int] = None,
+                     manifest_file: str = None, allow_gaps: bool = False,
+                     allow_overlaps: bool = False) -> MergePlan:
+    """
+    Puts input file names in merge order and checks the order
+    
+    Only names, page ranges in names and modification times are used, so a
+    folder that cannot be merged correctly fails before any file is read.
+    
+    Args:
+        names: Input file names (folder entries or archive members)
+        order: One of MERGE_ORDERS; a manifest file implies 'manifest'
+        mtimes: Modification times by name, needed for 'mtime'
+        manifest_file: File listing the names to merge, in order
+        allow_gaps: Report missing pages between ranges as warnings instead of errors
+        allow_overlaps: Report overlapping ranges as warnings instead of errors, for
+                        merges that deduplicate pages
+    
+    Returns:
+        MergePlan: Ordered files and warnings
+    
+    Raises:
+        PlanError: If the order is unknown or the files do not form a valid order
+    """
+    if manifest_file:
+        order = 'manifest'
+    if order not in MERGE_ORDERS:
+        raise PlanError(f"Unknown merge order {order!r} (expected {', '.join(MERGE_ORDERS)})")
+    
+    names = list(names)
+    warnings = []
+    ranges = {name: page_range(name) for name in names}
+    ranges = {name: file_range for name, file_range in ranges.items() if file_range is not None}
+    
+    if order == 'auto':
+        if names and len(ranges) == len(names):
+            order = 'ranges'
+        else:
+            order = 'natural'
+            if ranges:
+                warnings.append(f"{len(names) - len(ranges)} of {len(names)} files have no page range "
+                                f"in their name, using natural order")
+    
+    if order == 'manifest':
+        if not manifest_file:
+            raise PlanError("Merge order 'manifest' needs a manifest file")
+        listed = read_manifest(manifest_file)
+        available = set(names)
+        missing = [name for name in listed if name not in available]
+        if missing:
+            raise PlanError(f"Files listed in the manifest not found: {_quote(missing)}")
+        seen, duplicates = set(), []
+        for name in listed:
+            if name in seen:
+                duplicates.append(name)
+            seen.add(name)
+        if duplicates:
+            raise PlanError(f"Files listed more than once in the manifest: {_quote(duplicates)}")
+        unlisted = sorted((name for name in names if name not in seen), key=natural_key)
+        if unlisted:
+            warnings.append(f"Files not in the manifest are left out: {_quote(unlisted)}")
+        files = listed
+    elif order == 'mtime':
+        if mtimes is None:
+            raise PlanError("Merge order 'mtime' needs a folder, not an archive")
+        files = sorted(names, key=lambda name: (mtimes[name], natural_key(name)))
+    elif order == 'natural':
+        files = sorted(names, key=natural_key)
+    else:
+        unnamed = sorted((name for name in names if name not in ranges), key=natural_key)
+        if unnamed:
+            raise PlanError(f"Files without a page range in their name: {_quote(unnamed)}")
+        files = sorted(names, key=lambda name: (ranges[name], name))
+        warnings.extend(_check_ranges(files, ranges, allow_gaps, allow_overlaps))
+    
+    return MergePlan(files, order, {name: ranges[name] for name in files if name in ranges}, warnings)
+
+
+def _check_ranges(files: List[str], ranges: Dict[str, Tuple[int, int]], allow_gaps: bool,
+                  allow_overlaps: bool = False) -> List[str]:
+    """
+    Checks that sorted page ranges are well-formed, do not overlap and leave no gaps
+    
+    Returns:
+        List[str]: Overlap and gap warnings if they are allowed
+    
+    Raises:
+        PlanError: On reversed ranges, or overlaps and gaps unless allowed
+    """
+    reversed_ranges = [name for name in files if ranges[name][0] > ranges[name][1]]
+    if reversed_ranges:
+        raise PlanError(f"Page ranges ending before they start: {_quote(reversed_ranges)}")
+    
+    overlaps, gaps = [], []
+    expected, previous = 1, None
+    for name in files:
+        start, end = ranges[name]
+        if start < expected and previous is not None:
+            overlaps.append(f"{previous} and {name}")
+        elif start > expected:
+            gaps.append(f"pages {expected}-{start - 1} before {name}")
+        expected, previous = max(expected, end + 1), name
+    
+    if overlaps and not allow_overlaps:
+        raise PlanError(f"Overlapping page ranges: {_quote(overlaps)}")
+    if gaps and not allow_gaps:
+        raise PlanError(f"Missing pages: {_quote(gaps)}")
+    warnings = [f"Overlapping page ranges: {_quote(overlaps)}"] if overlaps else []
+    return warnings + ([f"Missing pages: {_quote(gaps)}"] if gaps else [])
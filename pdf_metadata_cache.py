@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Metadata Cache
+Persistent cache of page counts and trailer information of PDF files
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+
+# Bytes hashed at the start and at the end of a file to detect content changes
+PARTIAL_HASH_BYTES = 64 * 1024
+
+
+def partial_content_hash(file_path: str) -> str:
+    """
+    Hashes the first and the last bytes of a file
+    
+    The trailer and xref table live at the end of a PDF file, the header at the
+    start, so rewrites almost always change one of them.
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(PARTIAL_HASH_BYTES))
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        if size > PARTIAL_HASH_BYTES:
+            file.seek(max(size - PARTIAL_HASH_BYTES, PARTIAL_HASH_BYTES))
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def read_pdf_metadata(reader) -> dict:
+    """
+    Collects the cached information from an opened reader
+    
+    Args:
+        reader: pypdf.PdfReader of the file
+    
+    Returns:
+        dict: Page count, PDF version, encryption flag and trailer information
+    """
+    trailer = {}
+    for key in ('/Size', '/ID'):
+        if key in reader.trailer:
+            trailer[key] = str(reader.trailer[key])
+    try:
+        info = reader.metadata or {}
+        trailer['/Info'] = {key: str(value) for key, value in info.items()}
+    except Exception:
+        pass
+    
+    return {
+        'pages': len(reader.pages),
+        'version': reader.pdf_header,
+        'encrypted': bool(reader.is_encrypted),
+        'trailer': trailer,
+        'error': None,
+    }
+
+
+class PdfMetadataCache:
+    """
+    SQLite cache of PDF metadata keyed by path, size, mtime and a partial content hash
+    
+    Entries are evicted least recently used first once max_entries is exceeded.
+    """
+    
+    def __init__(self, db_path: str, max_entries: int = 10000):
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " partial_hash TEXT NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.connection.commit()
+    
+    @staticmethod
+    def for_folder(input_dir: str, max_entries: int = 10000) -> "PdfMetadataCache":
+        """Opens the cache stored next to a folder as <folder>.pdfcache.sqlite"""
+        input_path = Path(input_dir).resolve()
+        return PdfMetadataCache(input_path.parent / f"{input_path.name}.pdfcache.sqlite", max_entries)
+    
+    def get(self, file_path: str) -> Optional[dict]:
+        """
+        Returns cached metadata of an unchanged file
+        
+        Returns:
+            Optional[dict]: Metadata, None if the file is unknown or changed
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, partial_hash, metadata FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if (row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns
+                or row[2] != partial_content_hash(path)):
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        self.connection.execute("UPDATE files SET last_used = ? WHERE path = ?", (time.time(), path))
+        return json.loads(row[3])
+    
+    def put(self, file_path: str, metadata: dict) -> None:
+        """Stores metadata of a file and evicts old entries above the size limit"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, partial_hash, metadata, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, partial_content_hash(path), json.dumps(metadata), time.time()),
+        )
+        
+        count = self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM files WHERE path IN (SELECT path FROM files ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+    
+    def close(self) -> None:
+        """Saves changes and closes the database"""
+        self.connection.commit()
+        self.connection.close()
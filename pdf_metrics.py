@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Operation Metrics
+Per-phase and per-chunk timings of split and merge operations
+"""
+
+import os
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+class TimedWriter:
+    """
+    Wraps an output stream and measures the time spent in its write() calls
+    
+    The time a PDF writer spends in write() of its stream is the disk part of
+    saving; the rest of the save is object serialization.
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.seconds = 0.0
+    
+    def write(self, data) -> int:
+        started = time.perf_counter()
+        written = self.stream.write(data)
+        self.seconds += time.perf_counter() - started
+        return written
+    
+    def tell(self) -> int:
+        return self.stream.tell()
+    
+    def flush(self) -> None:
+        started = time.perf_counter()
+        self.stream.flush()
+        self.seconds += time.perf_counter() - started
+
+
+class PhaseTimer:
+    """
+    Collects (phase, start, seconds) spans and per-phase bytes and object counts
+    
+    Picklable, so that worker processes can return it. Start times are
+    wall-clock seconds so that spans of different processes line up.
+    """
+    
+    def __init__(self):
+        self.spans = []
+        self.counts = {}
+        self.pid = os.getpid()
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Times the enclosed block as one span of the phase"""
+        started_wall = time.time()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, started_wall, time.perf_counter() - started))
+    
+    def add(self, name: str, started_wall: float, seconds: float) -> None:
+        """Adds a span measured elsewhere"""
+        self.spans.append((name, started_wall, seconds))
+    
+    def count(self, name: str, bytes_count: int = 0, objects: int = 0) -> None:
+        """Adds bytes and objects handled by a phase"""
+        counts = self.counts.setdefault(name, [0, 0])
+        counts[0] += bytes_count
+        counts[1] += objects
+
+
+class OperationMetrics:
+    """
+    Timings, bytes and object counts of one split or merge
+    
+    Phases are summed over the whole run (seconds, number of spans, bytes and
+    objects); chunks hold the seconds per phase of every output file of a split
+    or input file of a merge.
+    """
+    
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.started = time.time()
+        self.seconds = 0.0
+        self.timer = PhaseTimer()
+        self.chunk_timers = []
+        self.chunks = []
+        self.phases = {}
+    
+    def phase(self, name: str):
+        """Context manager timing a phase of the run in this process"""
+        return self.timer.phase(name)
+    
+    def add_chunk(self, name: str, pages: int, timer: PhaseTimer, bytes_count: int = 0) -> None:
+        """Records the spans and counts of one chunk"""
+        seconds = {}
+        for phase, _, duration in timer.spans:
+            seconds[phase] = seconds.get(phase, 0.0) + duration
+        self.chunk_timers.append((name, timer))
+        self.chunks.append({
+            'name': name,
+            'pages': pages,
+            'bytes': bytes_count,
+            'objects': sum(objects for _, objects in timer.counts.values()),
+            'seconds': {phase: round(duration, 6) for phase, duration in seconds.items()},
+            'pid': timer.pid,
+        })
+    
+    def finish(self) -> None:
+        """Stops the run clock and sums spans and counts by phase"""
+        self.seconds = time.time() - self.started
+        self.phases = {}
+        for timer in [self.timer] + [timer for _, timer in self.chunk_timers]:
+            for phase, _, duration in timer.spans:
+                entry = self._phase_entry(phase)
+                entry['seconds'] += duration
+                entry['count'] += 1
+            for phase, (bytes_count, objects) in timer.counts.items():
+                entry = self._phase_entry(phase)
+                entry['bytes'] += bytes_count
+                entry['objects'] += objects
+    
+    def _phase_entry(self, phase: str) -> dict:
+        return self.phases.setdefault(phase, {'seconds': 0.0, 'count': 0, 'bytes': 0, 'objects': 0})
+    
+    def to_dict(self) -> dict:
+        """Returns the metrics as plain data"""
+        phases = {phase: dict(entry, seconds=round(entry['seconds'], 6))
+                  for phase, entry in self.phases.items()}
+        return {
+            'operation': self.operation,
+            'seconds': round(self.seconds, 6),
+            'phases': phases,
+            'chunks': self.chunks,
+        }
+    
+    def write_chrome_trace(self, trace_file: str) -> None:
+        """
+        Saves the spans in Chrome trace event format
+        
+        The file opens in chrome://tracing or https://ui.perfetto.dev; every
+        process of the run gets its own track.
+        """
+        events = []
+        for chunk, timer in [(None, self.timer)] + self.chunk_timers:
+            for phase, started_wall, duration in timer.spans:
+                event = {
+                    'name': phase,
+                    'ph': 'X',
+                    'ts': round((started_wall - self.started) * 1e6, 1),
+                    'dur': round(duration * 1e6, 1),
+                    'pid': timer.pid,
+                    'tid': timer.pid,
+                }
+                if chunk:
+                    event['args'] = {'chunk': chunk}
+                events.append(event)
+        
+        with open(trace_file, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'operation': self.operation}}, file)
+
+
+def start_profiler(profile_file: str = None) -> Optional[cProfile.Profile]:
+    """Starts cProfile if a profile file is requested"""
+    if not profile_file:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def finish_metrics(metrics: OperationMetrics, profiler: Optional[cProfile.Profile] = None,
+                   profile_file: str = None, trace_file: str = None) -> List[str]:
+    """
+    Finishes the metrics of a run and writes the requested profile and trace files
+    
+    Returns:
+        List[str]: Paths of the files written
+    """
+    written = []
+    metrics.finish()
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_file)
+        written.append(profile_file)
+    if trace_file:
+        metrics.write_chrome_trace(trace_file)
+        written.append(trace_file)
+    return written
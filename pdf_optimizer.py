@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Optimizer
+Rewrites PDF output with compressed streams, object streams and without unused objects
+"""
+
+import io
+import zlib
+from typing import FrozenSet
+import pypdf
+from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject,
+                           NumberObject, StreamObject)
+
+
+# Optimization modes:
+#   flate   - FlateDecode for streams without a filter
+#   objstm  - pack non-stream objects into object streams with a cross-reference stream (PDF 1.5)
+#   orphans - drop objects not reachable from the catalog or document info
+OPTIMIZE_MODES = ('flate', 'objstm', 'orphans')
+
+# Speed versus size: zlib level of compressed streams, 1 (fastest) to 9 (smallest).
+# At MAX_LEVEL streams already compressed with plain FlateDecode are recompressed too.
+MIN_LEVEL = 1
+MAX_LEVEL = 9
+DEFAULT_LEVEL = 6
+
+# Non-stream objects packed into one object stream
+OBJECTS_PER_STREAM = 200
+
+
+def parse_optimize_modes(modes) -> FrozenSet[str]:
+    """
+    Parses optimization modes like "flate,objstm" or "all"
+    
+    Raises:
+        ValueError: If a mode is unknown
+    """
+    if not modes:
+        return frozenset()
+    if isinstance(modes, str):
+        modes = [mode.strip().lower() for mode in modes.split(',') if mode.strip()]
+    if 'all' in modes:
+        return frozenset(OPTIMIZE_MODES)
+    unknown = sorted(set(modes) - set(OPTIMIZE_MODES))
+    if unknown:
+        raise ValueError(f"Unknown optimization mode: {', '.join(unknown)} "
+                         f"(expected {', '.join(OPTIMIZE_MODES)} or all)")
+    return frozenset(modes)
+
+
+def check_level(level: int) -> int:
+    """
+    Checks a speed versus size level
+    
+    Raises:
+        ValueError: If the level is outside MIN_LEVEL..MAX_LEVEL
+    """
+    level = int(level)
+    if not MIN_LEVEL <= level <= MAX_LEVEL:
+        raise ValueError(f"Optimization level must be between {MIN_LEVEL} and {MAX_LEVEL}")
+    return level
+
+
+def _serialize(obj) -> bytes:
+    buffer = io.BytesIO()
+    obj.write_to_stream(buffer)
+    return buffer.getvalue()
+
+
+class _OptimizingWriter:
+    """
+    Writes the objects of a reader renumbered from 1, reached from the trailer
+    
+    Streams are written as they are reached; other objects are written at once
+    or collected into object streams, so memory holds at most one object
+    stream besides the offsets.
+    """
+    
+    def __init__(self, reader: pypdf.PdfReader, stream, modes: FrozenSet[str], level: int):
+        self.reader = reader
+        self.stream = stream
+        self.modes = modes
+        self.level = level
+        self.numbers = {}
+        self.pending = []
+        self.next_number = 1
+        # Object number -> ('offset', position) or ('packed', object stream number, index)
+        self.locations = {}
+        self.packed = []
+    
+    def number_for(self, reference: IndirectObject) -> int:
+        key = (reference.idnum, reference.generation)
+        if key not in self.numbers:
+            self.numbers[key] = self.next_number
+            self.next_number += 1
+            self.pending.append(reference)
+        return self.numbers[key]
+    
+    def remap(self, obj):
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(self.number_for(obj), 0, None)
+        if isinstance(obj, StreamObject):
+            copy = StreamObject()
+            copy._data = obj._data
+        elif isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+        elif isinstance(obj, ArrayObject):
+            return ArrayObject(self.remap(item) for item in obj)
+        else:
+            return obj
+        for key, value in obj.items():
+            copy[key] = self.remap(value)
+        return copy
+    
+    def compress(self, stream: StreamObject) -> StreamObject:
+        """Applies FlateDecode to a stream, recompressing plain Flate streams at the highest level"""
+        data = stream._data
+        stream_filter = stream.get('/Filter')
+        if stream_filter is None:
+            compressed = zlib.compress(data, self.level)
+        elif (self.level == MAX_LEVEL and stream_filter in ('/FlateDecode', ['/FlateDecode'])
+              and '/DecodeParms' not in stream):
+            try:
+                compressed = zlib.compress(zlib.decompress(data), self.level)
+            except zlib.error:
+                return stream
+        else:
+            return stream
+        if len(compressed) >= len(data):
+            return stream
+        stream._data = compressed
+        stream[NameObject('/Filter')] = NameObject('/FlateDecode')
+        return stream
+    
+    def write(self) -> None:
+        """Writes the whole file"""
+        trailer = self.reader.trailer
+        root = self.number_for(trailer.raw_get('/Root'))
+        info = trailer.raw_get('/Info') if '/Info' in trailer else None
+        info = self.number_for(info) if isinstance(info, IndirectObject) else None
+        
+        # Objects reachable from the trailer, then the rest of the xref unless dropped
+        self.stream.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n" if 'objstm' in self.modes
+                          else f"{self.reader.pdf_header}\n%\xe2\xe3\xcf\xd3\n".encode())
+        self.write_pending()
+        if 'orphans' not in self.modes:
+            for generation, entries in sorted(self.reader.xref.items()):
+                for idnum in sorted(entries):
+                    self.number_for(IndirectObject(idnum, generation, self.reader))
+            for idnum in sorted(self.reader.xref_objStm):
+                self.number_for(IndirectObject(idnum, 0, self.reader))
+            self.write_pending()
+        self.flush_packed()
+        
+        trailer_entries = {NameObject('/Root'): IndirectObject(root, 0, None)}
+        if info is not None:
+            trailer_entries[NameObject('/Info')] = IndirectObject(info, 0, None)
+        if '/ID' in trailer:
+            trailer_entries[NameObject('/ID')] = trailer['/ID']
+        if 'objstm' in self.modes:
+            self.write_xref_stream(trailer_entries)
+        else:
+            self.write_xref_table(trailer_entries)
+    
+    def write_pending(self) -> None:
+        while self.pending:
+            reference = self.pending.pop()
+            try:
+                obj = reference.get_object()
+            except Exception:
+                obj = None
+            if obj is None:
+                obj = NullObject()
+            number = self.numbers[(reference.idnum, reference.generation)]
+            # Cross-reference and object streams of the source are rebuilt, not copied
+            if isinstance(obj, StreamObject) and obj.get('/Type') in ('/XRef', '/ObjStm'):
+                obj = NullObject()
+            
+            copy = self.remap(obj)
+            if isinstance(copy, StreamObject):
+                if 'flate' in self.modes:
+                    copy = self.compress(copy)
+                self.write_object(number, copy)
+            elif 'objstm' in self.modes:
+                self.packed.append((number, _serialize(copy)))
+                if len(self.packed) >= OBJECTS_PER_STREAM:
+                    self.flush_packed()
+            else:
+                self.write_object(number, copy)
+    
+    def write_object(self, number: int, obj) -> None:
+        self.locations[number] = ('offset', self.stream.tell())
+        self.stream.write(f"{number} 0 obj\n".encode())
+        obj.write_to_stream(self.stream)
+        self.stream.write(b"\nendobj\n")
+    
+    def flush_packed(self) -> None:
+        """Writes the collected objects as one object stream"""
+        if not self.packed:
+            return
+        stream_number = self.next_number
+        self.next_number += 1
+        
+        header, body = [], io.BytesIO()
+        for index, (number, data) in enumerate(self.packed):
+            header.append(f"{number} {body.tell()}")
+            body.write(data)
+            body.write(b"\n")
+            self.locations[number] = ('packed', stream_number, index)
+        header = " ".join(header).encode() + b"\n"
+        
+        object_stream = StreamObject()
+        object_stream._data = zlib.compress(header + body.getvalue(), self.level)
+        object_stream.update({
+            NameObject('/Type'): NameObject('/ObjStm'),
+            NameObject('/N'): NumberObject(len(self.packed)),
+            NameObject('/First'): NumberObject(len(header)),
+            NameObject('/Filter'): NameObject('/FlateDecode'),
+        })
+        self.packed = []
+        self.write_object(stream_number, object_stream)
+    
+    def write_xref_table(self, trailer_entries: dict) -> None:
+        xref_location = self.stream.tell()
+        self.stream.write(f"xref\n0 {self.next_number}\n".encode())
+        self.stream.write(b"0000000000 65535 f \n")
+        for number in range(1, self.next_number):
+            self.stream.write(f"{self.locations[number][1]:0>10} 00000 n \n".encode())
+        trailer = DictionaryObject(trailer_entries)
+        trailer[NameObject('/Size')] = NumberObject(self.next_number)
+        self.stream.write(b"trailer\n")
+        trailer.write_to_stream(self.stream)
+        self.stream.write(f"\nstartxref\n{xref_location}\n%%EOF\n".encode())
+    
+    def write_xref_stream(self, trailer_entries: dict) -> None:
+        xref_number = self.next_number
+        self.next_number += 1
+        xref_location = self.stream.tell()
+        self.locations[xref_number] = ('offset', xref_location)
+        
+        offset_width = max((xref_location.bit_length() + 7) // 8, 1)
+        index_width = max((OBJECTS_PER_STREAM.bit_length() + 7) // 8, 1)
+        rows = [b"\x00" + b"\x00" * offset_width + b"\xff" * index_width]
+        for number in range(1, self.next_number):
+            location = self.locations[number]
+            if location[0] == 'offset':
+                rows.append(b"\x01" + location[1].to_bytes(offset_width, 'big') + b"\x00" * index_width)
+            else:
+                rows.append(b"\x02" + location[1].to_bytes(offset_width, 'big')
+                            + location[2].to_bytes(index_width, 'big'))
+        
+        xref_stream = StreamObject()
+        xref_stream._data = zlib.compress(b"".join(rows), self.level)
+        xref_stream.update(trailer_entries)
+        xref_stream.update({
+            NameObject('/Type'): NameObject('/XRef'),
+            NameObject('/Size'): NumberObject(self.next_number),
+            NameObject('/W'): ArrayObject([NumberObject(1), NumberObject(offset_width),
+                                           NumberObject(index_width)]),
+            NameObject('/Filter'): NameObject('/FlateDecode'),
+        })
+        self.stream.write(f"{xref_number} 0 obj\n".encode())
+        xref_stream.write_to_stream(self.stream)
+        self.stream.write(f"\nendobj\nstartxref\n{xref_location}\n%%EOF\n".encode())
+
+
+def optimize_pdf(source, output, modes, level: int = DEFAULT_LEVEL) -> int:
+    """
+    Rewrites a PDF with the given optimization modes
+    
+    Args:
+        source: Seekable binary stream or path of the PDF to optimize
+        output: Binary stream with write() and tell() receiving the result
+        modes: Modes from OPTIMIZE_MODES as a set or a string like "flate,objstm"
+        level: Speed versus size, 1 (fastest) to 9 (smallest)
+    
+    Returns:
+        int: Bytes written
+    
+    Raises:
+        ValueError: If modes or level are invalid or the source is encrypted
+    """
+    modes = parse_optimize_modes(modes)
+    level = check_level(level)
+    reader = pypdf.PdfReader(source)
+    if reader.is_encrypted:
+        raise ValueError("Encrypted files cannot be optimized")
+    
+    start = output.tell()
+    _OptimizingWriter(reader, output, modes, level).write()
+    return output.tell() - start
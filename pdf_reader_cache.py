@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Reader Cache
+In-memory LRU cache of parsed PDF readers shared between operations
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from PyPDF2 import PdfReader
+
+
+# Default memory budget of the cached readers
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Estimated memory of a parsed object without stream data
+ESTIMATED_OBJECT_BYTES = 200
+
+
+def _estimate_reader_bytes(reader: PdfReader) -> int:
+    """Estimates the memory held by the objects a reader has parsed so far"""
+    total = 0
+    for obj in list(reader.resolved_objects.values()):
+        data = getattr(obj, '_data', None)
+        total += ESTIMATED_OBJECT_BYTES + (len(data) if data else 0)
+    xref = getattr(reader, 'xref', {})
+    total += sum(len(entries) for entries in xref.values()) * ESTIMATED_OBJECT_BYTES // 4
+    return total
+
+
+class _CachedReader:
+    """A reader with its open source file and usage state"""
+    
+    def __init__(self, key: tuple):
+        self.key = key
+        self.file = None
+        self.reader = None
+        self.size = 0
+        self.users = 0
+        # A reader seeks in one shared stream, so only one thread uses it at a time
+        self.lock = threading.Lock()
+    
+    def close_file(self) -> None:
+        """Closes the source file, keeping the parsed reader"""
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+    
+    def close(self) -> None:
+        self.close_file()
+        self.reader = None
+
+
+class ReaderCache:
+    """
+    Thread-safe LRU cache of PyPDF2 readers keyed by path, mtime and size
+    
+    A reader keeps the xref table, the page list and every object it parsed, so
+    a second operation on an unchanged file skips that work. Readers not in use
+    are evicted least recently used first once the estimated memory exceeds
+    max_bytes or more than max_entries files are cached. Threads asking for the
+    same file wait for each other, since a reader is not safe to share at once.
+    
+    The source file is only open while its reader is checked out, so cached
+    files can still be renamed, replaced or deleted (Windows locks open files).
+    """
+    
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = 8):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.by_reader = {}
+        self.lock = threading.Lock()
+    
+    def checkout(self, file_path: str) -> PdfReader:
+        """
+        Returns the parsed reader of a file, parsing it if it is not cached
+        
+        The reader is reserved for the caller until release() is called.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        
+        with self.lock:
+            # Older versions of the file are never asked for again
+            for old_key in [old_key for old_key in self.entries if old_key[0] == path and old_key != key]:
+                if self.entries[old_key].users == 0:
+                    self._drop(old_key)
+            
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                entry = self.entries[key] = _CachedReader(key)
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            entry.users += 1
+        
+        entry.lock.acquire()
+        try:
+            entry.file = open(path, 'rb')
+            if entry.reader is None:
+                entry.reader = PdfReader(entry.file)
+                with self.lock:
+                    self.by_reader[id(entry.reader)] = entry
+            else:
+                # Objects not parsed yet are read from the reopened file
+                entry.reader.stream = entry.file
+        except Exception:
+            if entry.reader is not None:
+                with self.lock:
+                    self.by_reader.pop(id(entry.reader), None)
+            entry.close()
+            self._release_entry(entry)
+            raise
+        return entry.reader
+    
+    def release(self, reader: PdfReader) -> None:
+        """Returns a reader taken with checkout() and evicts readers above the limits"""
+        with self.lock:
+            entry = self.by_reader.get(id(reader))
+        if entry is None:
+            return
+        entry.size = _estimate_reader_bytes(reader)
+        entry.close_file()
+        self._release_entry(entry)
+    
+    @contextmanager
+    def acquire(self, file_path: str):
+        """Context manager around checkout() and release()"""
+        reader = self.checkout(file_path)
+        try:
+            yield reader
+        finally:
+            self.release(reader)
+    
+    def _release_entry(self, entry: _CachedReader) -> None:
+        entry.lock.release()
+        with self.lock:
+            entry.users -= 1
+            if entry.reader is None and entry.users == 0 and self.entries.get(entry.key) is entry:
+                del self.entries[entry.key]
+            self._evict()
+    
+    def _evict(self) -> None:
+        """Drops idle readers, least recently used first, until the cache fits its limits"""
+        total = sum(entry.size for entry in self.entries.values())
+        for key in list(self.entries):
+            if total <= self.max_bytes and len(self.entries) <= self.max_entries:
+                break
+            entry = self.entries[key]
+            if entry.users == 0:
+                total -= entry.size
+                self._drop(key)
+    
+    def _drop(self, key: tuple) -> None:
+        entry = self.entries.pop(key)
+        if entry.reader is not None:
+            self.by_reader.pop(id(entry.reader), None)
+        entry.close()
+    
+    def clear(self) -> None:
+        """Closes all idle readers"""
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry.users == 0]:
+                self._drop(key)
+    
+    def stats(self) -> dict:
+        """Returns hit and miss counters, cached files and estimated memory"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'files': len(self.entries),
+                'bytes': sum(entry.size for entry in self.entries.values()),
+            }
@@ -8,181 +8,2576 @@ Utility for splitting and merging PDF files
 import os
 import sys
 import re
+import csv
+import json
+import time
+import argparse
+import io
+import mmap
+import tarfile
+import zipfile
+import shutil
+import tempfile
+from array import array
+from contextlib import ExitStack, contextmanager
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple, Union
 import PyPDF2
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
 import pypdf
 
+from pdf_metadata_cache import PdfMetadataCache, read_pdf_metadata
+from pdf_validator import validate_files
+from pdf_merge_plan import MERGE_ORDERS, PlanError, build_merge_plan, scan_folder
+from pdf_reader_cache import ReaderCache
+from pdf_fingerprint import FINGERPRINT_IGNORED_KEYS, ObjectFingerprinter
+from pdf_dedup import DEDUP_MODES, PageIndex, check_dedup_mode
+from pdf_tree_batch import (DEFAULT_INCLUDE, JOURNAL_NAME, TREE_OPERATIONS, BatchJournal, discover_inputs,
+                            tree_output_path)
+from pdf_optimizer import DEFAULT_LEVEL, check_level, optimize_pdf, parse_optimize_modes
+from pdf_metrics import OperationMetrics, PhaseTimer, TimedWriter, finish_metrics, start_profiler
+
+
+# Resource categories whose entries are usually shared between pages
+RESOURCE_CATEGORIES = ('/Font', '/XObject', '/ColorSpace', '/ExtGState', '/Pattern', '/Shading')
+
+# Approximate bytes each written object adds besides its body ("n 0 obj", "endobj", xref entry)
+OBJECT_OVERHEAD_BYTES = 40
+
+# Page attributes a page inherits from its page tree ancestors
+INHERITABLE_PAGE_ATTRIBUTES = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+# Default memory ceiling of merge inputs read ahead
+PREFETCH_MAX_BYTES = 256 * 1024 * 1024
+
+# Write buffer of output files committed by rename
+ATOMIC_BUFFER_BYTES = 1024 * 1024
+
+# Groups per worker of a parallel merge, so that uneven groups even out
+MERGE_GROUPS_PER_WORKER = 4
+
+# Chunks going into a tar archive are kept in memory up to this size, then on disk
+ARCHIVE_SPOOL_BYTES = 8 * 1024 * 1024
+# Archive suffixes and the tarfile compression they use (None for ZIP)
+ARCHIVE_SUFFIXES = {
+    '.zip': None,
+    '.tar': '',
+    '.tar.gz': 'gz',
+    '.tgz': 'gz',
+    '.tar.bz2': 'bz2',
+    '.tar.xz': 'xz',
+}
+
+
+# Fingerprints of PyPDF2 objects
+_fingerprinter = ObjectFingerprinter(PyPDF2.generic)
+
+
+def _page_fingerprints(pdf_reader: PdfReader) -> List[str]:
+    """
+    Computes a fingerprint of every page from its content streams, resources and attributes
+    
+    Returns:
+        List[str]: Fingerprints in page order
+    """
+    memo: Dict[int, bytes] = {}
+    return [_fingerprinter.fingerprint(page, memo).hex() for page in pdf_reader.pages]
+
+
+def _load_page_index(index_path: Path) -> dict:
+    """Reads the page fingerprint index of a previous split, empty if missing or unreadable"""
+    try:
+        with open(index_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def parse_page_ranges(ranges: str, total_pages: int) -> List[Tuple[int, int]]:
+    """
+    Parses an explicit list of page ranges like "1-3,7,10-end"
+    
+    Args:
+        ranges: Comma-separated pages or ranges, 1-based and inclusive, "end" is the last page
+        total_pages: Number of pages in the document
+        
+    Returns:
+        List[Tuple[int, int]]: Page ranges (0-based start inclusive, end exclusive) in the given order
+    """
+    def page_number(value: str) -> int:
+        value = value.strip().lower()
+        number = total_pages if value == 'end' else int(value)
+        if not 1 <= number <= total_pages:
+            raise ValueError(f"Page {value} is outside of the document (1-{total_pages})")
+        return number
+    
+    page_ranges = []
+    for part in ranges.split(','):
+        if not part.strip():
+            continue
+        start, separator, end = part.partition('-')
+        if separator and not (start.strip() and end.strip()):
+            # "3-" or "-5": an open side is not read as a single page
+            raise ValueError(f"Invalid page range: {part.strip()} (use \"end\" for the last page)")
+        start_page = page_number(start)
+        end_page = page_number(end) if separator else start_page
+        if end_page < start_page:
+            raise ValueError(f"Invalid page range: {part.strip()}")
+        page_ranges.append((start_page - 1, end_page))
+    
+    if not page_ranges:
+        raise ValueError("No page ranges specified")
+    return page_ranges
+
+
+def _page_tree_count(pdf_reader: PdfReader) -> int:
+    """Returns the page count stored in the root of the page tree"""
+    return int(pdf_reader.trailer['/Root'].get_object()['/Pages'].get_object()['/Count'])
+
+
+def _find_page(pdf_reader: PdfReader, page_num: int) -> PageObject:
+    """
+    Finds a page by walking down the page tree with the /Count of its nodes
+    
+    Only the nodes on the path to the page are parsed, while pdf_reader.pages
+    resolves every page of the document on first access.
+    
+    Args:
+        pdf_reader: Reader of the source PDF file
+        page_num: Index of the page (0-based)
+        
+    Returns:
+        PageObject: The page with the attributes it inherits from its ancestors
+    """
+    node = pdf_reader.trailer['/Root'].get_object()['/Pages'].get_object()
+    inherited = {}
+    remaining = page_num
+    while True:
+        for name in INHERITABLE_PAGE_ATTRIBUTES:
+            if name in node:
+                inherited[name] = node[name]
+        
+        kids = node['/Kids']
+        if int(node['/Count']) == len(kids) and '/Kids' not in kids[remaining].get_object():
+            # As many pages as kids: a leaf level, jump straight to the page without
+            # resolving its siblings. If the kid landed on is a /Pages node the counts
+            # only matched by chance and the kids are walked below. (A level where an
+            # empty /Pages node offsets a subtree elsewhere is not told apart.)
+            kids, remaining = kids[remaining:remaining + 1], 0
+        
+        for kid_reference in kids:
+            kid = kid_reference.get_object()
+            if '/Kids' in kid:
+                count = int(kid['/Count'])
+                if remaining < count:
+                    node = kid
+                    break
+                remaining -= count
+            elif remaining == 0:
+                page = PageObject(pdf_reader, kid_reference)
+                page.update({NameObject(name): value for name, value in inherited.items()})
+                page.update(kid)
+                return page
+            else:
+                remaining -= 1
+        else:
+            raise ValueError(f"Page {page_num + 1} not found in page tree")
+
+
+def _bookmark_ranges(pdf_reader: PdfReader) -> List[Tuple[int, int]]:
+    """Splits the document at the pages of its top-level bookmarks"""
+    total_pages = len(pdf_reader.pages)
+    starts = {0}
+    for item in pdf_reader.outline:
+        # Nested lists hold child bookmarks
+        if isinstance(item, list):
+            continue
+        try:
+            page_num = pdf_reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if 0 <= page_num < total_pages:
+            starts.add(page_num)
+    
+    starts = sorted(starts)
+    return [(start_page, end_page) for start_page, end_page in zip(starts, starts[1:] + [total_pages])]
+
+
+def _page_object_sizes(pdf_reader: PdfReader, page_num: int, sizes: Dict[int, int]) -> Dict[int, int]:
+    """
+    Estimates the written size of every object a page references
+    
+    Args:
+        pdf_reader: Reader of the source PDF file
+        page_num: Index of the page
+        sizes: Cache of object sizes by object number, shared between pages
+        
+    Returns:
+        Dict[int, int]: Estimated bytes by object number
+    """
+    page = pdf_reader.pages[page_num]
+    page_objects = {}
+    pending = [page.raw_get(key) for key in page.keys() if key not in FINGERPRINT_IGNORED_KEYS]
+    page_size = len(repr(page)) + OBJECT_OVERHEAD_BYTES
+    while pending:
+        obj = pending.pop()
+        if isinstance(obj, IndirectObject):
+            if obj.idnum in page_objects:
+                continue
+            resolved = obj.get_object()
+            # Links to other pages do not pull their content into this file
+            if isinstance(resolved, DictionaryObject) and resolved.get('/Type') in ('/Page', '/Pages'):
+                page_objects[obj.idnum] = 0
+                continue
+            if obj.idnum not in sizes:
+                buffer = io.BytesIO()
+                resolved.write_to_stream(buffer, None)
+                sizes[obj.idnum] = buffer.tell() + OBJECT_OVERHEAD_BYTES
+            page_objects[obj.idnum] = sizes[obj.idnum]
+            obj = resolved
+        if isinstance(obj, DictionaryObject):
+            pending.extend(obj.raw_get(key) for key in obj.keys() if key not in FINGERPRINT_IGNORED_KEYS)
+        elif isinstance(obj, ArrayObject):
+            pending.extend(obj)
+    
+    # The page dictionary itself is keyed by its position, it is never shared
+    page_objects[-1 - page_num] = page_size
+    return page_objects
+
+
+def _split_by_size(pdf_reader: PdfReader, start_page: int, end_page: int,
+                   max_bytes: int, sizes: Dict[int, int]) -> List[Tuple[int, int]]:
+    """
+    Splits a page range so the estimated size of each file stays within max_bytes
+    
+    Objects shared by pages of the same file are counted once. A single page
+    larger than the budget gets a file of its own.
+    """
+    page_ranges = []
+    chunk_start = start_page
+    chunk_objects = {}
+    chunk_bytes = 0
+    for page_num in range(start_page, end_page):
+        page_objects = _page_object_sizes(pdf_reader, page_num, sizes)
+        added = sum(size for idnum, size in page_objects.items() if idnum not in chunk_objects)
+        if page_num > chunk_start and chunk_bytes + added > max_bytes:
+            page_ranges.append((chunk_start, page_num))
+            chunk_start = page_num
+            chunk_objects = {}
+            chunk_bytes = 0
+            added = sum(page_objects.values())
+        chunk_objects.update(page_objects)
+        chunk_bytes += added
+    page_ranges.append((chunk_start, end_page))
+    return page_ranges
+
+
+def plan_split(pdf_reader: PdfReader, pages_per_file: int = 10, ranges: str = None,
+               by_bookmarks: bool = False, max_bytes: int = None) -> List[Tuple[int, int]]:
+    """
+    Computes the page ranges of output files before anything is written
+    
+    Explicit ranges take precedence over bookmarks, bookmarks over a fixed number
+    of pages per file. A size budget further splits each of these ranges; used
+    alone it applies to the whole document.
+    
+    Args:
+        pdf_reader: Reader of the source PDF file
+        pages_per_file: Number of pages in each output file
+        ranges: Explicit page ranges like "1-3,7,10-end"
+        by_bookmarks: Split at the pages of top-level bookmarks
+        max_bytes: Target maximum size of each output file in bytes
+        
+    Returns:
+        List[Tuple[int, int]]: Page ranges (0-based start inclusive, end exclusive)
+    """
+    total_pages = len(pdf_reader.pages)
+    if ranges:
+        page_ranges = parse_page_ranges(ranges, total_pages)
+    elif by_bookmarks:
+        page_ranges = _bookmark_ranges(pdf_reader)
+    elif max_bytes:
+        page_ranges = [(0, total_pages)] if total_pages else []
+    else:
+        page_ranges = [(start_page, min(start_page + pages_per_file, total_pages))
+                       for start_page in range(0, total_pages, pages_per_file)]
+    
+    if max_bytes:
+        sizes: Dict[int, int] = {}
+        page_ranges = [sized_range for start_page, end_page in page_ranges
+                       for sized_range in _split_by_size(pdf_reader, start_page, end_page, max_bytes, sizes)]
+    return page_ranges
+
+
+def _share_page_resources(pdf_reader: PdfReader, start_page: int, end_page: int) -> Tuple[List[tuple], int, int]:
+    """
+    Points identical resources of the given pages to a single indirect object
+    
+    Walks fonts, images, form XObjects, color spaces (ICC profiles) and other
+    resources of the pages, including nested form XObject resources.
+    
+    Returns:
+        Tuple[List[tuple], int, int]: Changes to revert after the pages were copied
+            as (dictionary, key, original value), number of resource objects used by
+            more than one page and number of duplicate copies replaced
+    """
+    memo: Dict[int, bytes] = {}
+    canonical: Dict[bytes, IndirectObject] = {}
+    pages_by_object: Dict[int, set] = {}
+    changes = []
+    
+    for page_num in range(start_page, end_page):
+        pending = [pdf_reader.pages[page_num].get('/Resources')]
+        visited = set()
+        while pending:
+            resources = pending.pop()
+            if resources is None:
+                continue
+            resources = resources.get_object()
+            if not isinstance(resources, DictionaryObject) or id(resources) in visited:
+                continue
+            visited.add(id(resources))
+            
+            for category in RESOURCE_CATEGORIES:
+                entries = resources.get(category)
+                if not isinstance(entries, DictionaryObject):
+                    continue
+                for name in list(entries.keys()):
+                    value = entries.raw_get(name)
+                    if not isinstance(value, IndirectObject):
+                        continue
+                    
+                    # Replace a duplicate with the first copy seen in this chunk
+                    target = canonical.setdefault(_fingerprinter.fingerprint(value, memo), value)
+                    if target.idnum != value.idnum:
+                        changes.append((entries, name, value))
+                        entries[NameObject(name)] = target
+                    pages_by_object.setdefault(target.idnum, set()).add(page_num)
+                    
+                    # Form XObjects carry their own resources
+                    resolved = target.get_object()
+                    if isinstance(resolved, StreamObject) and resolved.get('/Subtype') == '/Form':
+                        pending.append(resolved.get('/Resources'))
+    
+    shared_count = sum(1 for pages in pages_by_object.values() if len(pages) > 1)
+    return changes, shared_count, len(changes)
+
+
+def _compress_writer_streams(pdf_writer: PdfWriter) -> None:
+    """Applies FlateDecode to every stream of the writer that has no filter yet"""
+    for index, obj in enumerate(pdf_writer._objects):
+        if isinstance(obj, StreamObject) and '/Filter' not in obj:
+            encoded = obj.flate_encode()
+            for key, value in obj.items():
+                if key not in encoded:
+                    encoded[key] = value
+            encoded.indirect_reference = obj.indirect_reference
+            pdf_writer._objects[index] = encoded
+
+
+@contextmanager
+def _source_stream(file, memory_map: bool = False):
+    """
+    Provides the stream a PdfReader parses the source from
+    
+    With memory_map the file is mapped read-only, so object and stream data are
+    sliced straight out of the page cache instead of going through buffered reads.
+    """
+    if not memory_map:
+        yield file
+        return
+    
+    mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mapping
+    finally:
+        mapping.close()
+
+
+def _fsync_directory(folder: str) -> None:
+    """Makes renames in a folder durable (folders cannot be opened for this on Windows)"""
+    try:
+        descriptor = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+@contextmanager
+def _atomic_output(output_path, fsync: bool = False):
+    """
+    Opens an output file that appears under its name only once it is complete
+    
+    Data goes to "<name>.<pid>.tmp" next to the target through a large buffer.
+    When the block ends without error the file is optionally fsync'd and renamed
+    over the target; otherwise the temporary file is removed. A process killed
+    midway leaves only the temporary file, never a truncated target.
+    """
+    output_path = str(output_path)
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb', buffering=ATOMIC_BUFFER_BYTES) as file:
+            yield file
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+        os.replace(temp_path, output_path)
+        if fsync:
+            _fsync_directory(os.path.dirname(os.path.abspath(output_path)))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _open_output(output_path, atomic: bool = False, fsync: bool = False):
+    """Opens an output file for writing, through a temporary name if atomic or fsync is set"""
+    if atomic or fsync:
+        return _atomic_output(output_path, fsync)
+    return open(output_path, 'wb')
+
+
+def _remove_temp_outputs(folder: Path) -> int:
+    """
+    Removes temporary files of outputs left behind by a killed run
+    
+    Returns:
+        int: Number of files removed
+    """
+    removed = 0
+    for temp_path in folder.glob('*.pdf.*.tmp'):
+        temp_path.unlink()
+        removed += 1
+    return removed
+
+
+class _RunManifest:
+    """
+    JSONL record of the chunks a split has committed, for resuming an interrupted run
+    
+    The first line identifies the run (source path, size, modification time and
+    planned files); every further line names one chunk after it was renamed into
+    place. The manifest of a different run is started over.
+    """
+    
+    def __init__(self, manifest_path: Path, run: dict, fsync: bool = False):
+        self.manifest_path = manifest_path
+        self.fsync = fsync
+        self.committed = {}
+        # Compared after a JSON round trip, as it is read back
+        run = json.loads(json.dumps(run))
+        
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                text = file.read()
+        except OSError:
+            text = ""
+        entries = []
+        for line in text.splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A line cut off by the interruption
+                continue
+        
+        if entries and entries[0] == {'run': run}:
+            for entry in entries[1:]:
+                self.committed[entry['file']] = entry['bytes']
+            self.file = open(manifest_path, 'a', encoding='utf-8')
+            if not text.endswith("\n"):
+                self.file.write("\n")
+        else:
+            self.file = open(manifest_path, 'w', encoding='utf-8')
+            self._write({'run': run})
+    
+    def is_committed(self, output_path: Path) -> bool:
+        """Tells whether a chunk was committed by an earlier run and is still in place unchanged"""
+        size = self.committed.get(output_path.name)
+        return size is not None and output_path.exists() and output_path.stat().st_size == size
+    
+    def record(self, file_name: str, start_page: int, end_page: int, bytes_written: int) -> None:
+        """Records a committed chunk (pages 1-based, inclusive)"""
+        self.committed[file_name] = bytes_written
+        self._write({'file': file_name, 'start': start_page, 'end': end_page, 'bytes': bytes_written})
+    
+    def _write(self, entry: dict) -> None:
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+    
+    def close(self) -> None:
+        self.file.close()
+
+
+def _write_chunk(pdf_reader: PdfReader, start_page: int, end_page: int, output_path: Path,
+                 share_resources: bool = False, cancel_event=None, timer: PhaseTimer = None,
+                 optimize=None, optimize_level: int = DEFAULT_LEVEL, atomic: bool = False,
+                 fsync: bool = False) -> Tuple[int, int, int, PhaseTimer]:
+    """
+    Writes pages [start_page, end_page) of an opened reader into a new PDF file
+    
+    Args:
+        pdf_reader: Reader of the source PDF file
+        start_page: Index of the first page (0-based, inclusive)
+        end_page: Index of the last page (0-based, exclusive)
+        output_path: Path to the output file, or a binary stream with write() and tell()
+        share_resources: Write identical resources of the pages only once and compress streams
+        cancel_event: Event checked between pages, raises OperationCancelled when set
+        timer: Phase timer receiving the spans of this chunk (a new one if omitted)
+        optimize: Optimization modes applied to the written file (see pdf_optimizer)
+        optimize_level: Speed versus size of the optimization, 1 to 9
+        atomic: Write the file under a temporary name and rename it when complete
+        fsync: Also flush the file to disk before the rename
+        
+    Returns:
+        Tuple[int, int, int, PhaseTimer]: Bytes written, number of resources shared by
+            several pages, number of duplicate resource copies removed and the timer
+            with share, copy, compress, serialize, optimize and write spans
+    """
+    timer = timer or PhaseTimer()
+    
+    # Create new PDF writer
+    pdf_writer = PdfWriter()
+    
+    changes, shared_count, merged_count = [], 0, 0
+    if share_resources:
+        with timer.phase('share'):
+            changes, shared_count, merged_count = _share_page_resources(pdf_reader, start_page, end_page)
+    
+    try:
+        # Add pages to writer
+        with timer.phase('copy'):
+            for page_num in range(start_page, end_page):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise OperationCancelled()
+                pdf_writer.add_page(pdf_reader.pages[page_num])
+    finally:
+        # Pages are copied, leave the source objects untouched for other chunks
+        for entries, name, value in changes:
+            entries[NameObject(name)] = value
+    
+    if share_resources:
+        with timer.phase('compress'):
+            _compress_writer_streams(pdf_writer)
+    
+    # Save file
+    bytes_written = _save_writer(pdf_writer, output_path, timer, optimize, optimize_level, atomic, fsync)
+    
+    return bytes_written, shared_count, merged_count, timer
+
+
+def _save_writer(pdf_writer, output_path, timer: PhaseTimer, optimize=None,
+                 optimize_level: int = DEFAULT_LEVEL, atomic: bool = False, fsync: bool = False) -> int:
+    """
+    Saves a PyPDF2/pypdf writer or merger to a path or a binary stream
+    
+    Time spent in write() of the stream is recorded as the write span, the rest
+    of saving as the serialize span. With optimize the writer serializes into
+    memory first and the optimizer writes the result; its time is the optimize
+    span and the size before optimization is counted as the optimize bytes.
+    With atomic or fsync a path is written through a temporary name (see _atomic_output).
+    
+    Returns:
+        int: Bytes written
+    """
+    save, save_phase = pdf_writer.write, 'serialize'
+    if optimize:
+        started_wall, started = time.time(), time.perf_counter()
+        buffer = io.BytesIO()
+        pdf_writer.write(buffer)
+        timer.add('serialize', started_wall, time.perf_counter() - started)
+        timer.count('optimize', bytes_count=buffer.tell())
+        buffer.seek(0)
+        save, save_phase = (lambda stream: optimize_pdf(buffer, stream, optimize, optimize_level)), 'optimize'
+    
+    started_wall, started = time.time(), time.perf_counter()
+    if hasattr(output_path, 'write'):
+        output_stream = TimedWriter(output_path)
+        start = output_stream.tell()
+        save(output_stream)
+        bytes_written = output_stream.tell() - start
+    else:
+        with _open_output(output_path, atomic, fsync) as output_file:
+            output_stream = TimedWriter(output_file)
+            save(output_stream)
+            output_stream.flush()
+            bytes_written = output_file.tell()
+    serialize_seconds = time.perf_counter() - started - output_stream.seconds
+    timer.add(save_phase, started_wall, serialize_seconds)
+    timer.add('write', started_wall + serialize_seconds, output_stream.seconds)
+    if hasattr(pdf_writer, '_objects'):
+        timer.count('serialize', objects=len(pdf_writer._objects))
+    timer.count('write', bytes_count=bytes_written)
+    return bytes_written
+
+
+def _optimize_file(file_path: str, optimize, optimize_level: int, timer: PhaseTimer,
+                   fsync: bool = False) -> Tuple[int, int]:
+    """
+    Optimizes a written PDF file, replacing it once the optimized copy is complete
+    
+    Returns:
+        Tuple[int, int]: Size of the file before and after
+    """
+    bytes_before = os.path.getsize(file_path)
+    with timer.phase('optimize'):
+        # The source is closed before the optimized copy replaces it
+        with _atomic_output(file_path, fsync) as output, open(file_path, 'rb') as source:
+            bytes_after = optimize_pdf(source, output, optimize, optimize_level)
+    timer.count('optimize', bytes_count=bytes_before)
+    return bytes_before, bytes_after
+
+
+def _bytes_before(timer: PhaseTimer, bytes_written: int) -> int:
+    """Returns the size of a file before optimization, bytes_written if it was not optimized"""
+    counts = timer.counts.get('optimize')
+    return counts[0] if counts else bytes_written
+
+
+def _optimized_note(optimize, timer: PhaseTimer, bytes_written: int) -> str:
+    """Formats the sizes before and after optimization for a log line"""
+    if not optimize:
+        return ""
+    return f", {_bytes_before(timer, bytes_written)} -> {bytes_written} bytes"
+
+
+# Source of a split worker process, opened once by _init_split_worker
+_worker_source = None
+
+
+def _init_split_worker(input_file: str, memory_map: bool = False) -> None:
+    """
+    Process pool initializer: opens and parses the source once for all chunks of the process
+    
+    The file stays open for the life of the worker process. With memory_map the
+    objects parsed for a chunk are dropped after it, as in the single-process split.
+    """
+    global _worker_source
+    timer = PhaseTimer()
+    resources = ExitStack()
+    file = resources.enter_context(open(input_file, 'rb'))
+    source = resources.enter_context(_source_stream(file, memory_map))
+    with timer.phase('open'):
+        pdf_reader = PdfReader(source)
+        # The page tree is flattened once here rather than by the first chunk
+        len(pdf_reader.pages)
+    _worker_source = {'reader': pdf_reader, 'resources': resources, 'timer': timer, 'memory_map': memory_map}
+
+
+def _split_chunk_worker(start_page: int, end_page: int, output_path: Path, share_resources: bool = False,
+                        optimize=None, optimize_level: int = DEFAULT_LEVEL, atomic: bool = False,
+                        fsync: bool = False) -> Tuple[int, int, int, int, int, PhaseTimer]:
+    """
+    Process pool entry point: writes one chunk from the source opened by _init_split_worker
+    
+    The first chunk of each process carries the time spent opening the source.
+    
+    Returns:
+        Tuple[int, int, int, int, int, PhaseTimer]: Page range of the written chunk
+            followed by the statistics returned by _write_chunk
+    """
+    timer = _worker_source.pop('timer', None) or PhaseTimer()
+    stats = _write_chunk(_worker_source['reader'], start_page, end_page, output_path, share_resources,
+                         timer=timer, optimize=optimize, optimize_level=optimize_level, atomic=atomic,
+                         fsync=fsync)
+    if _worker_source['memory_map']:
+        # Objects of this chunk are written, let them be parsed again on demand
+        _worker_source['reader'].resolved_objects.clear()
+    return (start_page, end_page) + stats
+
+
+def archive_suffix(path: str):
+    """Returns the archive suffix of a path like '.zip' or '.tar.gz', None if it is not an archive"""
+    name = str(path).lower()
+    for suffix in sorted(ARCHIVE_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+
+class _CountingWriter:
+    """Adds tell() to a write-only stream such as a ZIP entry"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.position = 0
+    
+    def write(self, data) -> int:
+        self.stream.write(data)
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self.position
+
+
+class _ChunkArchive:
+    """
+    Writes split chunks as entries of a ZIP or tar archive, or of a tar stream on stdout
+    
+    ZIP entries are compressed while the chunk is written; tar needs each entry's
+    size up front, so a chunk is spooled (in memory up to ARCHIVE_SPOOL_BYTES,
+    then in a temporary file) and copied into the archive. Only one chunk is
+    held at a time.
+    """
+    
+    def __init__(self, target: str):
+        self.target = target
+        self.zip = None
+        self.tar = None
+        if target == '-':
+            self.tar = tarfile.open(fileobj=sys.stdout.buffer, mode='w|')
+            return
+        
+        suffix = archive_suffix(target)
+        if suffix is None:
+            raise ValueError(f"Unsupported archive type: {target} "
+                             f"(use one of {', '.join(ARCHIVE_SUFFIXES)} or - for stdout)")
+        if ARCHIVE_SUFFIXES[suffix] is None:
+            self.zip = zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            self.tar = tarfile.open(target, f"w:{ARCHIVE_SUFFIXES[suffix]}")
+    
+    @contextmanager
+    def entry(self, name: str):
+        """Yields a stream with write() and tell() whose content becomes the entry name"""
+        if self.zip is not None:
+            with self.zip.open(name, 'w', force_zip64=True) as stream:
+                yield _CountingWriter(stream)
+            return
+        
+        with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_BYTES) as spool:
+            yield spool
+            self._add_tar_entry(name, spool)
+    
+    def add_file(self, file_path: str, name: str) -> None:
+        """Copies a written chunk file into the archive"""
+        if self.zip is not None:
+            self.zip.write(file_path, name)
+        else:
+            with open(file_path, 'rb') as file:
+                self._add_tar_entry(name, file)
+    
+    def _add_tar_entry(self, name: str, file) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = file.seek(0, os.SEEK_END)
+        info.mtime = int(time.time())
+        file.seek(0)
+        self.tar.addfile(info, file)
+    
+    def close(self) -> None:
+        """Finishes the archive"""
+        if self.zip is not None:
+            self.zip.close()
+        else:
+            self.tar.close()
+            if self.target == '-':
+                sys.stdout.buffer.flush()
+
+
+def _archive_members(archive_path: str) -> List[str]:
+    """Lists the PDF entries of a ZIP or tar archive"""
+    if ARCHIVE_SUFFIXES[archive_suffix(archive_path)] is None:
+        with zipfile.ZipFile(archive_path) as archive:
+            return [name for name in archive.namelist() if name.lower().endswith('.pdf')]
+    with tarfile.open(archive_path) as archive:
+        return [member.name for member in archive.getmembers()
+                if member.isfile() and member.name.lower().endswith('.pdf')]
+
+
+def _archive_input_files(archive_path: str, members: List[str]):
+    """
+    Yields (name, path, binary file) of archive entries in the given order
+    
+    Each entry is read into memory on its own when its turn comes, nothing is extracted to disk.
+    """
+    if ARCHIVE_SUFFIXES[archive_suffix(archive_path)] is None:
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in members:
+                with archive.open(member) as entry:
+                    data = entry.read()
+                yield member, f"{archive_path}/{member}", io.BytesIO(data)
+    else:
+        with tarfile.open(archive_path) as archive:
+            for member in members:
+                with archive.extractfile(member) as entry:
+                    data = entry.read()
+                yield member, f"{archive_path}/{member}", io.BytesIO(data)
+
+
+def _timed_inputs(inputs):
+    """Yields (name, path, file, PhaseTimer) of inputs, the wait for each one recorded as its read span"""
+    try:
+        while True:
+            timer = PhaseTimer()
+            with timer.phase('read'):
+                item = next(inputs, None)
+            if item is None:
+                return
+            yield item + (timer,)
+    finally:
+        inputs.close()
+
+
+def _read_file(file_path: str) -> bytes:
+    """Reads a whole file, used by the read-ahead threads"""
+    with open(file_path, 'rb') as file:
+        return file.read()
+
+
+def _input_files(input_dir: str, pdf_files: List[str], prefetch: int = 0,
+                 prefetch_max_bytes: int = PREFETCH_MAX_BYTES):
+    """
+    Yields (name, path, binary file) of merge inputs in the given order
+    
+    With prefetch > 0 up to that many following files are read into memory on a
+    thread pool while the current one is processed, as long as the buffered files
+    stay under prefetch_max_bytes; the next file in order is always read.
+    """
+    if prefetch <= 0:
+        for pdf_file in pdf_files:
+            file_path = os.path.join(input_dir, pdf_file)
+            with open(file_path, 'rb') as file:
+                yield pdf_file, file_path, file
+        return
+    
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+    buffered_bytes = 0
+    next_index = 0
+    try:
+        for pdf_file in pdf_files:
+            while next_index < len(pdf_files) and len(pending) <= prefetch:
+                file_path = os.path.join(input_dir, pdf_files[next_index])
+                size = os.path.getsize(file_path)
+                if pending and buffered_bytes + size > prefetch_max_bytes:
+                    break
+                pending.append((executor.submit(_read_file, file_path), size))
+                buffered_bytes += size
+                next_index += 1
+            
+            future, size = pending.popleft()
+            yield pdf_file, os.path.join(input_dir, pdf_file), io.BytesIO(future.result())
+            buffered_bytes -= size
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class OperationCancelled(Exception):
+    """Raised inside an operation when its cancel event is set"""
+
+
+class _ProgressTracker:
+    """
+    Counts processed pages, files and bytes and reports them to a progress callback
+    
+    The callback receives a dict with pages_done, total_pages, files_done,
+    total_files, bytes_written, elapsed, pages_per_sec, bytes_per_sec,
+    fraction (0..1) and eta (seconds, None until something is done).
+    """
+    
+    def __init__(self, callback=None, cancel_event=None, total_pages: int = 0, total_files: int = 0):
+        self.callback = callback
+        self.cancel_event = cancel_event
+        self.total_pages = total_pages
+        self.total_files = total_files
+        self.pages_done = 0
+        self.files_done = 0
+        self.bytes_written = 0
+        self.started = time.perf_counter()
+    
+    def check_cancelled(self) -> None:
+        """Raises OperationCancelled once the cancel event is set"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise OperationCancelled()
+    
+    def advance(self, pages: int = 0, files: int = 0, bytes_written: int = 0) -> None:
+        """Adds processed work and notifies the callback"""
+        self.pages_done += pages
+        self.files_done += files
+        self.bytes_written += bytes_written
+        if self.callback is None:
+            return
+        
+        elapsed = time.perf_counter() - self.started
+        if self.total_pages:
+            fraction = self.pages_done / self.total_pages
+        elif self.total_files:
+            fraction = self.files_done / self.total_files
+        else:
+            fraction = 1.0
+        self.callback({
+            'pages_done': self.pages_done,
+            'total_pages': self.total_pages,
+            'files_done': self.files_done,
+            'total_files': self.total_files,
+            'bytes_written': self.bytes_written,
+            'elapsed': elapsed,
+            'pages_per_sec': self.pages_done / elapsed if elapsed > 0 else 0.0,
+            'bytes_per_sec': self.bytes_written / elapsed if elapsed > 0 else 0.0,
+            'fraction': min(fraction, 1.0),
+            'eta': elapsed * (1 - fraction) / fraction if fraction > 0 else None,
+        })
+
+
+class _StreamingPdfWriter:
+    """
+    Incremental PDF writer used by the streaming merge
+    
+    Objects of each input are renumbered and written to the output as soon as
+    they are reached from a page, so only xref offsets and the list of page
+    references stay in memory between inputs. Only pages are copied: the output
+    catalog has no outlines, named destinations or AcroForm, and no /Info is written.
+    """
+    
+    CATALOG_NUMBER = 1
+    PAGES_NUMBER = 2
+    HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.offsets = {}
+        self.kids = []
+        self.next_number = self.PAGES_NUMBER + 1
+        self.stream.write(self.HEADER)
+    
+    def _reference(self, number: int):
+        return pypdf.generic.IndirectObject(number, 0, None)
+    
+    def append_reader(self, reader: pypdf.PdfReader, skip=()) -> int:
+        """
+        Copies the pages of a reader to the output
+        
+        Args:
+            skip: Indexes (0-based) of pages left out
+        
+        Returns:
+            int: Number of pages copied
+        """
+        numbers = {}
+        pending = []
+        
+        def number_for(reference) -> int:
+            if reference.idnum not in numbers:
+                numbers[reference.idnum] = self.next_number
+                self.next_number += 1
+                pending.append(reference)
+            return numbers[reference.idnum]
+        
+        def remap(obj):
+            if isinstance(obj, pypdf.generic.IndirectObject):
+                return self._reference(number_for(obj))
+            if isinstance(obj, pypdf.generic.StreamObject):
+                copy = pypdf.generic.StreamObject()
+                copy._data = obj._data
+            elif isinstance(obj, pypdf.generic.DictionaryObject):
+                copy = pypdf.generic.DictionaryObject()
+            elif isinstance(obj, pypdf.generic.ArrayObject):
+                return pypdf.generic.ArrayObject(remap(item) for item in obj)
+            else:
+                return obj
+            for key, value in obj.items():
+                copy[key] = remap(value)
+            return copy
+        
+        # Page tree nodes of the input are replaced by the output page tree
+        pending_nodes = [reader.trailer['/Root'].raw_get('/Pages')]
+        while pending_nodes:
+            node = pending_nodes.pop()
+            if isinstance(node, pypdf.generic.IndirectObject):
+                numbers[node.idnum] = self.PAGES_NUMBER
+            node = node.get_object()
+            if isinstance(node, pypdf.generic.DictionaryObject) and node.get('/Type') != '/Page':
+                pending_nodes.extend(node.get('/Kids', []))
+        
+        # The page tree is read before anything is numbered or written, so an input
+        # with a broken page tree raises here and leaves the output as it was
+        pages = [page for index, page in enumerate(reader.pages) if index not in skip]
+        
+        # Pages get their numbers first so that references between pages stay valid
+        page_numbers = []
+        for page in pages:
+            number = self.next_number
+            self.next_number += 1
+            if page.indirect_reference is not None:
+                numbers[page.indirect_reference.idnum] = number
+            page_numbers.append(number)
+        
+        for page, number in zip(pages, page_numbers):
+            page_copy = remap(pypdf.generic.DictionaryObject(
+                (key, value) for key, value in page.items() if key not in ('/Parent', '/StructParents')))
+            page_copy[pypdf.generic.NameObject('/Parent')] = self._reference(self.PAGES_NUMBER)
+            self._write_object(number, page_copy)
+            self.kids.append(number)
+            
+            # Write everything the page references before moving on
+            while pending:
+                reference = pending.pop()
+                try:
+                    obj = reference.get_object()
+                except Exception:
+                    obj = None
+                if obj is None:
+                    obj = pypdf.generic.NullObject()
+                self._write_object(numbers[reference.idnum], remap(obj))
+        
+        return len(page_numbers)
+    
+    def _write_object(self, number: int, obj) -> None:
+        """Writes one indirect object and remembers its offset"""
+        self.offsets[number] = self.stream.tell()
+        self.stream.write(f"{number} 0 obj\n".encode())
+        obj.write_to_stream(self.stream)
+        self.stream.write(b"\nendobj\n")
+    
+    def append_fragment(self, fragment_path: str, fragment: dict) -> int:
+        """
+        Copies a fragment written by _FragmentWriter, renumbering its objects after the current ones
+        
+        Only the recorded object numbers are rewritten; everything between them
+        is copied as is, so no object is parsed again.
+        
+        Returns:
+            int: Number of pages appended
+        """
+        base = self.next_number - 1
+        with open(fragment_path, 'rb') as file:
+            data = file.read()
+        view = memoryview(data)
+        last = 0
+        for position, number in zip(fragment['positions'], fragment['numbers']):
+            self.stream.write(view[last:position])
+            local = abs(number)
+            if number < 0:
+                # Object header
+                self.offsets[base + local] = self.stream.tell()
+            self.stream.write(str(self.PAGES_NUMBER if local == 0 else base + local).encode())
+            last = position + len(str(local))
+        self.stream.write(view[last:])
+        
+        self.kids.extend(base + local for local in fragment['kids'])
+        self.next_number += fragment['objects']
+        return len(fragment['kids'])
+    
+    def finish(self) -> None:
+        """Writes the page tree, catalog, xref table and trailer"""
+        pages = pypdf.generic.DictionaryObject({
+            pypdf.generic.NameObject('/Type'): pypdf.generic.NameObject('/Pages'),
+            pypdf.generic.NameObject('/Kids'): pypdf.generic.ArrayObject(
+                pypdf.generic.IndirectObject(number, 0, None) for number in self.kids),
+            pypdf.generic.NameObject('/Count'): pypdf.generic.NumberObject(len(self.kids)),
+        })
+        self._write_object(self.PAGES_NUMBER, pages)
+        catalog = pypdf.generic.DictionaryObject({
+            pypdf.generic.NameObject('/Type'): pypdf.generic.NameObject('/Catalog'),
+            pypdf.generic.NameObject('/Pages'): pypdf.generic.IndirectObject(self.PAGES_NUMBER, 0, None),
+        })
+        self._write_object(self.CATALOG_NUMBER, catalog)
+        
+        xref_location = self.stream.tell()
+        self.stream.write(f"xref\n0 {self.next_number}\n".encode())
+        self.stream.write(b"0000000000 65535 f \n")
+        for number in range(1, self.next_number):
+            self.stream.write(f"{self.offsets[number]:0>10} 00000 n \n".encode())
+        self.stream.write(f"trailer\n<< /Size {self.next_number} /Root {self.CATALOG_NUMBER} 0 R >>\n".encode())
+        self.stream.write(f"startxref\n{xref_location}\n%%EOF\n".encode())
+
+
+def _index_runs(indexes: List[int]) -> List[Tuple[int, int]]:
+    """Groups ascending indexes into (start, stop) runs of consecutive values"""
+    runs = []
+    for index in indexes:
+        if runs and runs[-1][1] == index:
+            runs[-1] = (runs[-1][0], index + 1)
+        else:
+            runs.append((index, index + 1))
+    return runs
+
+
+def _merge_groups(input_paths: List[str], count: int) -> List[List[str]]:
+    """Divides merge inputs into up to count contiguous groups of about equal total size"""
+    sizes = [os.path.getsize(input_path) for input_path in input_paths]
+    target = sum(sizes) / max(count, 1)
+    groups, group, group_bytes = [], [], 0
+    for input_path, size in zip(input_paths, sizes):
+        if group and group_bytes + size / 2 > target and len(groups) < count - 1:
+            groups.append(group)
+            group, group_bytes = [], 0
+        group.append(input_path)
+        group_bytes += size
+    groups.append(group)
+    return groups
+
+
+def _merge_group_worker(input_paths: List[str],
+                        fragment_path: str) -> Tuple[int, List[Tuple[str, str]], dict, PhaseTimer]:
+    """
+    Process pool entry point: writes a group of files in order as a fragment of the merged file
+    
+    Returns:
+        Tuple[int, List[Tuple[str, str]], dict, PhaseTimer]: Pages written, (file, error)
+            of skipped files (error None for files without pages), the fragment description
+            from _FragmentWriter.finish and the timer with read, append and write spans
+    """
+    timer = PhaseTimer()
+    pages = 0
+    skipped = []
+    with open(fragment_path, 'wb') as output:
+        output_stream = TimedWriter(output)
+        writer = _FragmentWriter(output_stream)
+        for input_path in input_paths:
+            with timer.phase('read'):
+                with open(input_path, 'rb') as file:
+                    data = io.BytesIO(file.read())
+            
+            started_wall, started = time.time(), time.perf_counter()
+            write_seconds = output_stream.seconds
+            try:
+                reader = pypdf.PdfReader(data)
+                page_count = len(reader.pages)
+            except Exception as e:
+                skipped.append((os.path.basename(input_path), str(e)))
+                continue
+            if page_count == 0:
+                skipped.append((os.path.basename(input_path), None))
+                continue
+            pages += writer.append_reader(reader)
+            write_seconds = output_stream.seconds - write_seconds
+            append_seconds = time.perf_counter() - started - write_seconds
+            timer.add('append', started_wall, append_seconds)
+            timer.add('write', started_wall + append_seconds, write_seconds)
+        
+        fragment = writer.finish()
+        timer.count('write', bytes_count=output.tell(), objects=fragment['objects'])
+    return pages, skipped, fragment, timer
+
+
+class _RecordedReference(pypdf.generic.IndirectObject):
+    """Indirect reference that records where its object number is written"""
+    
+    def __init__(self, idnum: int, tokens: List[array]):
+        super().__init__(idnum, 0, None)
+        self.tokens = tokens
+    
+    def write_to_stream(self, stream, encryption_key=None) -> None:
+        positions, numbers = self.tokens
+        positions.append(stream.tell())
+        numbers.append(self.idnum)
+        stream.write(f"{self.idnum} 0 R".encode())
+
+
+class _FragmentWriter(_StreamingPdfWriter):
+    """
+    Streaming writer for one group of a parallel merge
+    
+    Writes only the objects of the pages, numbered from 1, with /Parent pointing
+    to object 0. The position of every object number is recorded (negative numbers
+    for object headers), so that _StreamingPdfWriter.append_fragment can renumber
+    the fragment into the final file without parsing it.
+    """
+    
+    PAGES_NUMBER = 0
+    HEADER = b""
+    
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.tokens = [array('q'), array('q')]
+    
+    def _reference(self, number: int):
+        return _RecordedReference(number, self.tokens)
+    
+    def _write_object(self, number: int, obj) -> None:
+        positions, numbers = self.tokens
+        positions.append(self.stream.tell())
+        numbers.append(-number)
+        super()._write_object(number, obj)
+    
+    def finish(self) -> dict:
+        """Returns the object count, page objects and recorded number positions of the fragment"""
+        positions, numbers = self.tokens
+        return {
+            'objects': self.next_number - 1,
+            'kids': array('q', self.kids),
+            'positions': positions,
+            'numbers': numbers,
+        }
+
 
 class PDFSplitter:
     """Class for working with PDF files"""
     
-    def __init__(self):
+    def __init__(self, log=print, reader_cache: ReaderCache = None):
+        """
+        Args:
+            log: Function receiving every message of the operations
+            reader_cache: Cache of parsed source readers shared by the operations
+                          (a new one with the default memory budget if omitted;
+                          ReaderCache(max_bytes=0) keeps nothing between operations)
+        """
         self.supported_formats = ['.pdf']
+        self.log = log
+        self.reader_cache = reader_cache if reader_cache is not None else ReaderCache()
+        # Pages, files, bytes and output path written by the last split or merge
+        self.last_stats = {}
+        # OperationMetrics of the last split or merge
+        self.last_metrics = None
     
-    def split_pdf(self, input_file: str, pages_per_file: int = 10) -> bool:
+    def split_pdf(self, input_file: str, pages_per_file: int = 10, workers: int = 1,
+                  share_resources: bool = False, memory_map: bool = False,
+                  output_dir: str = None, incremental: bool = False, ranges: str = None,
+                  by_bookmarks: bool = False, max_bytes: int = None,
+                  progress_callback=None, cancel_event=None, archive: str = None,
+                  profile_file: str = None, trace_file: str = None, optimize: str = None,
+                  optimize_level: int = DEFAULT_LEVEL, atomic: bool = False, fsync: bool = False,
+                  resume: bool = False) -> bool:
         """
         Splits a PDF file into files by the specified number of pages
         
         Args:
             input_file: Path to the source PDF file
             pages_per_file: Number of pages in each output file
+            workers: Number of worker processes writing chunks in parallel
+                     (1 keeps the serial mode)
+            share_resources: Write fonts, images and other resources used by several
+                             pages only once per file, compress streams and report
+                             bytes written against the source size
+            memory_map: Read the source through mmap and drop parsed objects after
+                        each file, keeping memory flat on very large inputs
+            output_dir: Folder for output files (optional, defaults to a folder
+                        named after the source file next to it)
+            incremental: Keep a page fingerprint index next to the output folder and
+                         rewrite only files whose pages changed since the last split
+            ranges: Explicit page ranges of output files like "1-3,7,10-end"
+            by_bookmarks: Start a new file at every top-level bookmark
+            max_bytes: Target maximum size of each output file, estimated from the
+                       objects the pages reference
+            progress_callback: Function receiving a progress dict after every file
+                               (pages, bytes, throughput and ETA)
+            cancel_event: threading.Event or similar; once set, the split stops and
+                          files written by this run are removed
+            archive: Write the chunks as {start}-{end}.pdf entries of this ZIP or tar
+                     archive (.zip, .tar, .tar.gz, .tgz, .tar.bz2, .tar.xz) instead of a
+                     folder, or as a tar stream to stdout with "-" (log must not print
+                     to stdout then)
+            profile_file: Save cProfile statistics of the run (this process only) to this file
+            trace_file: Save the phase spans as a Chrome trace JSON file
+            optimize: Optimization modes of every output file, e.g. "flate,objstm,orphans"
+                      or "all" (FlateDecode for uncompressed streams, object streams with a
+                      cross-reference stream, removal of unreferenced objects)
+            optimize_level: Speed versus size of the optimization, 1 (fastest) to 9 (smallest)
+            atomic: Write every file under a temporary name and rename it into place
+                    once complete, so no truncated file is ever visible
+            fsync: Also flush every file to disk before its rename (implies atomic)
+            resume: Record committed files in "<output folder>.run.jsonl" and skip the
+                    files an interrupted run of the same split already committed
+                    (implies atomic)
             
         Returns:
-            bool: True if operation is successful, False otherwise
+            bool: True if operation is successful, False otherwise; timings per phase
+                  and per file are left in last_metrics
         """
+        self.last_stats = {}
+        self.last_metrics = metrics = OperationMetrics('split')
+        run_manifest = None
+        profiler = start_profiler(profile_file)
+        written_paths = []
+        chunk_archive = None
+        temp_dir = None
         try:
             # Check if file exists
             if not os.path.exists(input_file):
-                print(f"Error: File {input_file} not found")
+                self.log(f"Error: File {input_file} not found")
                 return False
             
             # Check file extension
             if not input_file.lower().endswith('.pdf'):
-                print("Error: Only PDF files are supported")
+                self.log("Error: Only PDF files are supported")
+                return False
+            
+            if archive and incremental:
+                self.log("Error: Incremental split needs a folder, not an archive")
+                return False
+            if archive and (atomic or fsync or resume):
+                self.log("Error: Atomic output and resume need a folder, not an archive")
+                return False
+            atomic = atomic or fsync or resume
+            
+            try:
+                optimize = parse_optimize_modes(optimize)
+                optimize_level = check_level(optimize_level)
+            except ValueError as e:
+                self.log(f"Error: {str(e)}")
                 return False
             
             # Create folder name for output files
             input_path = Path(input_file)
-            output_dir = input_path.parent / input_path.stem
-            output_dir.mkdir(exist_ok=True)
+            if archive:
+                output_dir = Path(archive)
+                destination = "standard output" if archive == '-' else f"archive: {archive}"
+                chunk_archive = _ChunkArchive(archive)
+            else:
+                output_dir = Path(output_dir) if output_dir else input_path.parent / input_path.stem
+                output_dir.mkdir(parents=True, exist_ok=True)
+                destination = f"folder: {output_dir}"
             
             # Open PDF file
-            with open(input_file, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                total_pages = len(pdf_reader.pages)
+            with self._open_source(input_file, metrics, memory_map) as pdf_reader:
+                with metrics.phase('open'):
+                    total_pages = len(pdf_reader.pages)
+                
+                self.log(f"Source file contains {total_pages} pages")
+                
+                # Page ranges of output files
+                with metrics.phase('plan'):
+                    page_ranges = plan_split(pdf_reader, pages_per_file, ranges, by_bookmarks, max_bytes)
+                if ranges or by_bookmarks or max_bytes:
+                    self.log(f"Creating {len(page_ranges)} files by split plan in {destination}")
+                else:
+                    self.log(f"Creating files with {pages_per_file} pages each in {destination}")
+                
+                if incremental:
+                    # Files whose pages have the same fingerprints as last time are kept
+                    index_path = output_dir.with_name(f"{output_dir.name}.pages.json")
+                    previous_index = _load_page_index(index_path)
+                    previous_pages = previous_index.get('pages', [])
+                    with metrics.phase('fingerprint'):
+                        fingerprints = _page_fingerprints(pdf_reader)
+                    all_ranges = page_ranges
+                    page_ranges = [(start_page, end_page) for start_page, end_page in all_ranges
+                                   if fingerprints[start_page:end_page] != previous_pages[start_page:end_page]
+                                   or not (output_dir / f"{start_page + 1}-{end_page}.pdf").exists()]
+                    skipped_count = len(all_ranges) - len(page_ranges)
+                
+                if resume:
+                    # Files committed by an interrupted run of the same split are kept
+                    source_stat = os.stat(input_file)
+                    run_manifest = _RunManifest(
+                        output_dir.with_name(f"{output_dir.name}.run.jsonl"),
+                        {'source': os.path.abspath(input_file), 'size': source_stat.st_size,
+                         'mtime_ns': source_stat.st_mtime_ns,
+                         'files': [f"{start_page + 1}-{end_page}.pdf" for start_page, end_page in page_ranges]},
+                        fsync)
+                    _remove_temp_outputs(output_dir)
+                    planned_count = len(page_ranges)
+                    page_ranges = [(start_page, end_page) for start_page, end_page in page_ranges
+                                   if not run_manifest.is_committed(output_dir / f"{start_page + 1}-{end_page}.pdf")]
+                    if planned_count > len(page_ranges):
+                        self.log(f"Resuming: {planned_count - len(page_ranges)} of {planned_count} files "
+                                 f"already written")
                 
-                print(f"Source file contains {total_pages} pages")
-                print(f"Creating files with {pages_per_file} pages each in folder: {output_dir}")
+                if memory_map:
+                    # Objects parsed while planning are not needed any more
+                    pdf_reader.resolved_objects.clear()
                 
                 # Split into files
                 file_count = 0
-                for start_page in range(0, total_pages, pages_per_file):
-                    end_page = min(start_page + pages_per_file, total_pages)
-                    file_count += 1
-                    
-                    # Create new PDF writer
-                    pdf_writer = PdfWriter()
-                    
-                    # Add pages to writer
-                    for page_num in range(start_page, end_page):
-                        pdf_writer.add_page(pdf_reader.pages[page_num])
-                    
-                    # Form output filename
-                    output_filename = f"{start_page + 1}-{end_page}.pdf"
-                    output_path = output_dir / output_filename
-                    
-                    # Save file
-                    with open(output_path, 'wb') as output_file:
-                        pdf_writer.write(output_file)
+                bytes_written = bytes_before = shared_count = merged_count = 0
+                tracker = _ProgressTracker(progress_callback, cancel_event,
+                                           sum(end_page - start_page for start_page, end_page in page_ranges),
+                                           len(page_ranges))
+                if workers > 1 and len(page_ranges) > 1:
+                    # Each worker process parses the source once, results are collected in page order
+                    with ProcessPoolExecutor(max_workers=workers, initializer=_init_split_worker,
+                                             initargs=(input_file, memory_map)) as executor:
+                        # Chunks for an archive are written to a temporary folder first
+                        if chunk_archive is not None:
+                            temp_dir = Path(tempfile.mkdtemp(prefix='pdf_split_'))
+                        output_paths = [(temp_dir or output_dir) / f"{start_page + 1}-{end_page}.pdf"
+                                        for start_page, end_page in page_ranges]
+                        futures = [executor.submit(_split_chunk_worker, start_page, end_page, output_path,
+                                                   share_resources, optimize, optimize_level, atomic, fsync)
+                                   for (start_page, end_page), output_path in zip(page_ranges, output_paths)]
+                        try:
+                            for future in futures:
+                                tracker.check_cancelled()
+                                (start_page, end_page, chunk_bytes, chunk_shared, chunk_merged,
+                                 chunk_timer) = future.result()
+                                if chunk_archive is not None:
+                                    chunk_path = temp_dir / f"{start_page + 1}-{end_page}.pdf"
+                                    with chunk_timer.phase('archive'):
+                                        chunk_archive.add_file(chunk_path, chunk_path.name)
+                                    chunk_path.unlink()
+                                elif run_manifest is not None:
+                                    run_manifest.record(f"{start_page + 1}-{end_page}.pdf", start_page + 1,
+                                                        end_page, chunk_bytes)
+                                metrics.add_chunk(f"{start_page + 1}-{end_page}.pdf", end_page - start_page,
+                                                  chunk_timer, chunk_bytes)
+                                file_count += 1
+                                bytes_written += chunk_bytes
+                                bytes_before += _bytes_before(chunk_timer, chunk_bytes)
+                                shared_count += chunk_shared
+                                merged_count += chunk_merged
+                                self.log(f"Created file: {start_page + 1}-{end_page}.pdf "
+                                         f"(pages {start_page + 1}-{end_page}"
+                                         f"{_optimized_note(optimize, chunk_timer, chunk_bytes)})")
+                                tracker.advance(end_page - start_page, 1, chunk_bytes)
+                        except OperationCancelled:
+                            # Let running chunks finish so that their files can be removed
+                            executor.shutdown(wait=True, cancel_futures=True)
+                            written_paths.extend(output_path for output_path, future in zip(output_paths, futures)
+                                                 if not future.cancelled())
+                            raise
+                else:
+                    for start_page, end_page in page_ranges:
+                        tracker.check_cancelled()
+                        file_count += 1
+                        
+                        # Form output filename
+                        output_filename = f"{start_page + 1}-{end_page}.pdf"
+                        if chunk_archive is not None:
+                            with chunk_archive.entry(output_filename) as entry:
+                                chunk_bytes, chunk_shared, chunk_merged, chunk_timer = _write_chunk(
+                                    pdf_reader, start_page, end_page, entry, share_resources, cancel_event,
+                                    optimize=optimize, optimize_level=optimize_level)
+                        else:
+                            written_paths.append(output_dir / output_filename)
+                            chunk_bytes, chunk_shared, chunk_merged, chunk_timer = _write_chunk(
+                                pdf_reader, start_page, end_page, output_dir / output_filename, share_resources,
+                                cancel_event, optimize=optimize, optimize_level=optimize_level,
+                                atomic=atomic, fsync=fsync)
+                            if run_manifest is not None:
+                                run_manifest.record(output_filename, start_page + 1, end_page, chunk_bytes)
+                        metrics.add_chunk(output_filename, end_page - start_page, chunk_timer, chunk_bytes)
+                        bytes_written += chunk_bytes
+                        bytes_before += _bytes_before(chunk_timer, chunk_bytes)
+                        shared_count += chunk_shared
+                        merged_count += chunk_merged
+                        
+                        if memory_map:
+                            # Objects of this file are written, let them be parsed again on demand
+                            pdf_reader.resolved_objects.clear()
+                        
+                        self.log(f"Created file: {output_filename} (pages {start_page + 1}-{end_page}"
+                                 f"{_optimized_note(optimize, chunk_timer, chunk_bytes)})")
+                        tracker.advance(end_page - start_page, 1, chunk_bytes)
+                
+                if share_resources:
+                    source_size = os.path.getsize(input_file)
+                    self.log(f"Shared resources: {shared_count} written once per file, "
+                          f"{merged_count} duplicate copies removed")
+                    self.log(f"Bytes written: {bytes_written} of source size {source_size} "
+                          f"({bytes_written / max(source_size, 1) * 100:.1f}%)")
+                
+                if optimize:
+                    self.log(f"Optimized output: {bytes_before} -> {bytes_written} bytes "
+                             f"({bytes_written / max(bytes_before, 1) * 100:.1f}%)")
+                
+                if incremental:
+                    # Chunk files of the previous split that are no longer part of it
+                    current_files = [f"{start_page + 1}-{end_page}.pdf" for start_page, end_page in all_ranges]
+                    for stale_file in sorted(set(previous_index.get('files', [])) - set(current_files)):
+                        stale_path = output_dir / stale_file
+                        if stale_path.exists():
+                            stale_path.unlink()
+                            self.log(f"Removed outdated file: {stale_file}")
                     
-                    print(f"Created file: {output_filename} (pages {start_page + 1}-{end_page})")
+                    with open(index_path, 'w', encoding='utf-8') as index_file:
+                        json.dump({'source': str(input_path), 'pages': fingerprints, 'files': current_files},
+                                  index_file)
+                    self.log(f"Incremental split: {file_count} files rewritten, {skipped_count} unchanged files skipped")
+                
+                if chunk_archive is not None:
+                    chunk_archive.close()
+                    chunk_archive = None
                 
-                print(f"\nSplitting completed! Created {file_count} files in folder: {output_dir}")
+                self.last_stats = {'pages': total_pages, 'files': file_count, 'bytes': bytes_written,
+                                   'output': str(output_dir)}
+                if optimize:
+                    self.last_stats['bytes_before'] = bytes_before
+                
+                self.log(f"\nSplitting completed! Created {file_count} files in {destination}")
                 return True
                 
+        except OperationCancelled:
+            # Remove files of this run, a partly written set is worse than none
+            for written_path in written_paths:
+                if written_path.exists():
+                    written_path.unlink()
+            self.log(f"Splitting cancelled, removed {len(written_paths)} written files")
+            return False
         except Exception as e:
-            print(f"Error splitting PDF: {str(e)}")
+            self.log(f"Error splitting PDF: {str(e)}")
             return False
+        finally:
+            self._finish_metrics(metrics, profiler, profile_file, trace_file)
+            if run_manifest is not None:
+                run_manifest.close()
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            if chunk_archive is not None:
+                # Not finished: drop the partial archive
+                try:
+                    chunk_archive.close()
+                except Exception:
+                    pass
+                if archive != '-' and os.path.exists(archive):
+                    os.remove(archive)
     
-    def merge_pdfs(self, input_dir: str, output_file: str = None) -> bool:
+    def extract(self, input_file: Union[str, PdfReader], ranges: str, output_file: str = None) -> bool:
+        """
+        Writes the pages of the given ranges of a PDF file into one new file
+        
+        Pages are found by walking the page tree and only the objects they
+        reference are copied, so the time depends on the extracted pages rather
+        than on the size of the source.
+        
+        Args:
+            input_file: Path to the source PDF file, or an opened PdfReader (its
+                        stream must stay open) so that repeated extractions reuse
+                        the parsed xref table
+            ranges: Pages or ranges in output order like "4001-4010,4020", 1-based
+            output_file: Path to output file (optional for a path input, defaults to
+                         <source>_pages_<ranges>.pdf next to the source)
+            
+        Returns:
+            bool: True if operation is successful, False otherwise
+        """
+        self.last_stats = {}
+        self.last_metrics = metrics = OperationMetrics('extract')
+        try:
+            if isinstance(input_file, PdfReader):
+                if not output_file:
+                    self.log("Error: Output file is required when extracting from a reader")
+                    return False
+                return self._extract_pages(input_file, ranges, output_file, metrics)
+            
+            # Check if file exists
+            if not os.path.exists(input_file):
+                self.log(f"Error: File {input_file} not found")
+                return False
+            
+            if not output_file:
+                input_path = Path(input_file)
+                range_name = re.sub(r'[^0-9a-z]+', '_', ranges.lower()).strip('_')
+                output_file = input_path.parent / f"{input_path.stem}_pages_{range_name}.pdf"
+            
+            with self._open_source(input_file, metrics) as pdf_reader:
+                return self._extract_pages(pdf_reader, ranges, output_file, metrics)
+            
+        except Exception as e:
+            self.log(f"Error extracting pages: {str(e)}")
+            return False
+        finally:
+            self._finish_metrics(metrics)
+    
+    @contextmanager
+    def _open_source(self, input_file: str, metrics: OperationMetrics, memory_map: bool = False):
+        """
+        Provides a parsed reader of a source file
+        
+        Readers come from the reader cache, so repeated operations on an unchanged
+        file skip parsing; memory-mapped sources are parsed for one operation only.
+        """
+        if memory_map:
+            with open(input_file, 'rb') as file, _source_stream(file, memory_map) as source:
+                with metrics.phase('open'):
+                    pdf_reader = PdfReader(source)
+                yield pdf_reader
+            return
+        
+        with metrics.phase('open'):
+            pdf_reader = self.reader_cache.checkout(input_file)
+        try:
+            yield pdf_reader
+        finally:
+            self.reader_cache.release(pdf_reader)
+    
+    def _extract_pages(self, pdf_reader: PdfReader, ranges: str, output_file: str,
+                       metrics: OperationMetrics) -> bool:
+        """Locates the pages of the ranges in an opened reader and writes them"""
+        with metrics.phase('locate'):
+            total_pages = _page_tree_count(pdf_reader)
+            page_ranges = parse_page_ranges(ranges, total_pages)
+            pages = [_find_page(pdf_reader, page_num)
+                     for start_page, end_page in page_ranges for page_num in range(start_page, end_page)]
+        
+        pdf_writer = PdfWriter()
+        with metrics.phase('copy'):
+            for page in pages:
+                pdf_writer.add_page(page)
+        bytes_written = _save_writer(pdf_writer, output_file, metrics.timer)
+        
+        self.last_stats = {'pages': len(pages), 'files': 1, 'bytes': bytes_written, 'output': str(output_file)}
+        self.log(f"Extracted {len(pages)} of {total_pages} pages into: {output_file}")
+        return True
+    
+    def merge_pdfs(self, input_dir: str, output_file: str = None, streaming: bool = False,
+                   progress_callback=None, cancel_event=None, use_cache: bool = False,
+                   fast_check: bool = False, check_workers: int = 8, prefetch: int = 0,
+                   prefetch_max_bytes: int = PREFETCH_MAX_BYTES, profile_file: str = None,
+                   trace_file: str = None, optimize: str = None,
+                   optimize_level: int = DEFAULT_LEVEL, workers: int = 1, order: str = 'auto',
+                   manifest_file: str = None, allow_gaps: bool = False, atomic: bool = False,
+                   fsync: bool = False, dedup: str = None, files: List[str] = None) -> bool:
         """
         Merges PDF files from a folder into one file
         
         Args:
-            input_dir: Path to folder with PDF files
+            input_dir: Path to folder with PDF files, or to a ZIP or tar archive of
+                       them (entries are read one at a time, nothing is extracted)
             output_file: Path to output file (optional)
+            streaming: Parse each input once and write its objects to the output
+                       right away, so memory is bounded by the largest input; only
+                       pages are copied, outlines, named destinations, AcroForm and
+                       /Info of the inputs are dropped (so also with workers > 1)
+            progress_callback: Function receiving a progress dict after every input file
+            cancel_event: threading.Event or similar; once set, the merge stops and
+                          the partly written output file is removed
+            use_cache: Keep page counts and trailer information of inputs in a
+                       SQLite cache next to the folder, so unchanged files are not
+                       parsed again just to be checked (folders only; with workers > 1
+                       the inputs the cache does not know are fast-checked)
+            fast_check: Check inputs concurrently from their trailer and xref table
+                        only; files failing the fast check get a full parse (folders only)
+            check_workers: Number of threads used by the fast check
+            prefetch: Number of following inputs read into memory on threads while
+                      the current one is merged (0 reads files one by one, folders only)
+            prefetch_max_bytes: Memory ceiling of the inputs read ahead
+            profile_file: Save cProfile statistics of the run to this file
+            trace_file: Save the phase spans as a Chrome trace JSON file
+            optimize: Optimization modes of the merged file, e.g. "flate,objstm,orphans" or "all"
+            optimize_level: Speed versus size of the optimization, 1 (fastest) to 9 (smallest)
+            workers: Number of worker processes merging groups of inputs in parallel
+                     (1 keeps the single-process merge, folders only)
+            order: Merge order of the inputs: 'auto', 'ranges', 'natural', 'mtime' or
+                   'manifest' (see pdf_merge_plan); checked before any file is read
+            manifest_file: Text file listing the input names to merge, one per line, in order
+            allow_gaps: Merge files named by page ranges even if pages are missing between them
+            atomic: Write the merged file under a temporary name and rename it into place
+                    once complete, so no truncated file is ever visible
+            fsync: Also flush the merged file to disk before the rename (implies atomic)
+            dedup: 'report' to list pages repeated across inputs, 'skip' to also leave
+                   them out of the merged file (see pdf_dedup); overlapping page
+                   ranges in names are then allowed
+            files: Names of the inputs to merge, e.g. those a tree batch selected;
+                   None merges every PDF file of the folder or archive
             
         Returns:
-            bool: True if operation is successful, False otherwise
+            bool: True if operation is successful, False otherwise; timings per phase
+                  and per input file are left in last_metrics
         """
+        self.last_stats = {}
+        self.last_metrics = metrics = OperationMetrics('merge')
+        profiler = start_profiler(profile_file)
+        cache = None
         try:
             # Check if folder exists
             if not os.path.exists(input_dir):
-                print(f"Error: Folder {input_dir} not found")
+                self.log(f"Error: Folder {input_dir} not found")
                 return False
             
-            # Get list of PDF files and sort them
-            pdf_files = []
-            for file in os.listdir(input_dir):
-                if file.lower().endswith('.pdf'):
-                    pdf_files.append(file)
+            try:
+                optimize = parse_optimize_modes(optimize)
+                optimize_level = check_level(optimize_level)
+                dedup = check_dedup_mode(dedup)
+            except ValueError as e:
+                self.log(f"Error: {str(e)}")
+                return False
+            
+            from_archive = os.path.isfile(input_dir) and archive_suffix(input_dir) is not None
+            if from_archive and (use_cache or fast_check):
+                self.log("Metadata cache and fast check work on folders only, not used for archive")
+                use_cache = fast_check = False
+            if from_archive and workers > 1:
+                self.log("Parallel merge works on folders only, merging archive in one process")
+                workers = 1
+            if dedup and workers > 1:
+                # Whether a page is a duplicate depends on every input before it
+                self.log("Page deduplication runs in one process, not merging in parallel")
+                workers = 1
+            
+            if use_cache:
+                cache = PdfMetadataCache.for_folder(input_dir)
+            
+            # Get list of PDF files and put them in merge order
+            if from_archive:
+                pdf_files, mtimes = _archive_members(input_dir), None
+            else:
+                mtimes = scan_folder(input_dir)
+                pdf_files = list(mtimes)
+            if files is not None:
+                selected = set(files)
+                pdf_files = [pdf_file for pdf_file in pdf_files if pdf_file in selected]
+                if mtimes is not None:
+                    mtimes = {pdf_file: mtimes[pdf_file] for pdf_file in pdf_files}
             
             if not pdf_files:
-                print("Error: No PDF files found in folder")
+                self.log("Error: No PDF files found in folder")
                 return False
             
-            # Sort files by page numbers
-            def extract_page_numbers(filename):
-                """Extracts page numbers from filename for sorting"""
-                # Look for pattern: digits-digits at the beginning of filename
-                match = re.match(r'^(\d+)-(\d+)', filename)
-                if match:
-                    return int(match.group(1))  # Return first number for sorting
-                return 0
-            
-            pdf_files.sort(key=extract_page_numbers)
+            # The order is checked from names alone, before any file is read
+            try:
+                with metrics.phase('plan'):
+                    plan = build_merge_plan(pdf_files, order, mtimes, manifest_file, allow_gaps,
+                                            allow_overlaps=bool(dedup))
+            except PlanError as e:
+                self.log(f"Error: {str(e)}")
+                return False
+            pdf_files = plan.files
+            for warning in plan.warnings:
+                self.log(f"Warning: {warning}")
             
-            print(f"Found PDF files (in merge order):")
+            self.log(f"Found PDF files (in {plan.order} merge order):")
             for i, pdf_file in enumerate(pdf_files, 1):
-                match = re.match(r'^(\d+)-(\d+)', pdf_file)
-                if match:
-                    start_page = match.group(1)
-                    end_page = match.group(2)
-                    print(f"  {i}. {pdf_file} (pages {start_page}-{end_page})")
+                if pdf_file in plan.ranges:
+                    start_page, end_page = plan.ranges[pdf_file]
+                    self.log(f"  {i}. {pdf_file} (pages {start_page}-{end_page})")
                 else:
-                    print(f"  {i}. {pdf_file} (order not determined)")
+                    self.log(f"  {i}. {pdf_file}")
             
             # Create output filename if not specified
             if not output_file:
                 input_path = Path(input_dir)
-                output_file = input_path.parent / f"{input_path.name}_merged.pdf"
+                input_name = input_path.name[:-len(archive_suffix(input_dir))] if from_archive else input_path.name
+                output_file = input_path.parent / f"{input_name}_merged.pdf"
+            
+            # Workers of the parallel merge parse their own inputs, so there the cache
+            # is consulted through the fast check, which stores what it finds
+            parallel = workers > 1 and len(pdf_files) > 1
+            prechecked = {}
+            if fast_check or (parallel and cache is not None):
+                with metrics.phase('check'):
+                    prechecked = self._validate_inputs(input_dir, pdf_files, cache, check_workers)
+            
+            page_index = PageIndex(dedup, plan.ranges) if dedup else None
             
-            print(f"Merging {len(pdf_files)} files:")
+            self.log(f"Merging {len(pdf_files)} files:")
+            tracker = _ProgressTracker(progress_callback, cancel_event, total_files=len(pdf_files))
+            
+            def open_inputs():
+                """Yields (name, path, binary file) of the inputs in merge order"""
+                if from_archive:
+                    return _archive_input_files(input_dir, pdf_files)
+                return _input_files(input_dir, pdf_files, prefetch, prefetch_max_bytes)
+            
+            if streaming or parallel:
+                if parallel:
+                    total_pages = self._merge_parallel(input_dir, pdf_files, output_file, workers, tracker,
+                                                       prechecked, metrics, atomic, fsync)
+                else:
+                    inputs = open_inputs()
+                    total_pages = self._merge_streaming(inputs, output_file, tracker, cache, prechecked, metrics,
+                                                        atomic, fsync, page_index)
+                self.last_stats = {'pages': total_pages, 'files': len(pdf_files),
+                                   'bytes': os.path.getsize(output_file), 'output': str(output_file)}
+                if optimize:
+                    # The streamed output is only complete at the end, so it is rewritten afterwards
+                    self.last_stats['bytes_before'], self.last_stats['bytes'] = _optimize_file(
+                        output_file, optimize, optimize_level, metrics.timer, fsync)
+                    self._log_optimized(self.last_stats)
+                self._log_cache_summary(cache)
+                self._log_duplicates(page_index)
+                
+                self.log(f"\nMerging completed!")
+                self.log(f"Created file: {output_file}")
+                self.log(f"Total number of pages: {total_pages}")
+                return True
             
             # Use pypdf for more reliable merging
             merger = pypdf.PdfMerger()
             
             try:
-                for pdf_file in pdf_files:
-                    file_path = os.path.join(input_dir, pdf_file)
-                    print(f"  Adding: {pdf_file}")
+                for pdf_file, file_path, file, timer in _timed_inputs(open_inputs()):
+                    tracker.check_cancelled()
+                    self.log(f"  Adding: {pdf_file}")
                     
-                    # Open file and add to merger
-                    with open(file_path, 'rb') as file:
-                        # Check that file is not corrupted
-                        try:
-                            test_reader = pypdf.PdfReader(file)
-                            if len(test_reader.pages) == 0:
-                                print(f"    Warning: {pdf_file} contains no pages, skipping")
-                                continue
-                        except Exception as e:
-                            print(f"    Error reading {pdf_file}: {str(e)}, skipping")
-                            continue
-                        
-                        # Return to beginning of file
-                        file.seek(0)
-                        merger.append(file)
+                    # Check that file is not corrupted
+                    with timer.phase('check'):
+                        metadata, reader = self._check_input(file, file_path, cache, prechecked.get(pdf_file))
+                    if metadata['error']:
+                        self.log(f"    Error reading {pdf_file}: {metadata['error']}, skipping")
+                        metrics.add_chunk(pdf_file, 0, timer)
+                        tracker.advance(files=1)
+                        continue
+                    if metadata['pages'] == 0:
+                        self.log(f"    Warning: {pdf_file} contains no pages, skipping")
+                        metrics.add_chunk(pdf_file, 0, timer)
+                        tracker.advance(files=1)
+                        continue
+                    
+                    # Return to beginning of file and add to merger
+                    file.seek(0)
+                    try:
+                        if page_index is None:
+                            with timer.phase('append'):
+                                merger.append(file)
+                            pages = metadata['pages']
+                        else:
+                            reader, kept = self._dedup_input(page_index, pdf_file, file, reader, timer)
+                            with timer.phase('append'):
+                                # pypdf takes (start, stop) ranges, so each run of kept pages is appended
+                                for start, stop in _index_runs(kept):
+                                    merger.append(reader, pages=(start, stop), import_outline=start == kept[0])
+                            pages = len(kept)
+                    except Exception as e:
+                        # The fast check does not read the page tree, so a file it passed may still fail
+                        self.log(f"    Error reading {pdf_file}: {e}, skipping")
+                        metrics.add_chunk(pdf_file, 0, timer)
+                        tracker.advance(files=1)
+                        continue
+                    metrics.add_chunk(pdf_file, pages, timer, file.seek(0, os.SEEK_END))
+                    tracker.advance(pages, 1)
+                
+                tracker.check_cancelled()
                 
                 # Save merged file
-                with open(output_file, 'wb') as output:
-                    merger.write(output)
+                bytes_written = _save_writer(merger, output_file, metrics.timer, optimize, optimize_level,
+                                             atomic, fsync)
                 
                 total_pages = len(merger.pages)
+                self.last_stats = {'pages': total_pages, 'files': len(pdf_files),
+                                   'bytes': bytes_written, 'output': str(output_file)}
+                if optimize:
+                    self.last_stats['bytes_before'] = _bytes_before(metrics.timer, bytes_written)
+                    self._log_optimized(self.last_stats)
+                self._log_cache_summary(cache)
+                self._log_duplicates(page_index)
                 
-                print(f"\nMerging completed!")
-                print(f"Created file: {output_file}")
-                print(f"Total number of pages: {total_pages}")
+                self.log(f"\nMerging completed!")
+                self.log(f"Created file: {output_file}")
+                self.log(f"Total number of pages: {total_pages}")
                 return True
                 
             finally:
                 # Important to close merger to free resources
                 merger.close()
             
+        except OperationCancelled:
+            self.log("Merging cancelled")
+            return False
+        except Exception as e:
+            self.log(f"Error merging PDF: {str(e)}")
+            return False
+        finally:
+            self._finish_metrics(metrics, profiler, profile_file, trace_file)
+            if cache is not None:
+                cache.close()
+    
+    def _log_optimized(self, stats: dict) -> None:
+        """Logs the size of a merged file before and after optimization"""
+        self.log(f"Optimized output: {stats['bytes_before']} -> {stats['bytes']} bytes "
+                 f"({stats['bytes'] / max(stats['bytes_before'], 1) * 100:.1f}%)")
+    
+    def _dedup_input(self, page_index: PageIndex, pdf_file: str, file, reader: pypdf.PdfReader,
+                     timer: PhaseTimer) -> Tuple[pypdf.PdfReader, List[int]]:
+        """
+        Fingerprints the pages of an input in the dedup phase
+        
+        Returns:
+            Tuple[pypdf.PdfReader, List[int]]: Reader of the input (parsed here if not
+                given) and the indexes of the pages to merge
+        """
+        with timer.phase('dedup'):
+            if reader is None:
+                reader = pypdf.PdfReader(file)
+            repeated = page_index.check(pdf_file, reader)
+        if repeated and page_index.mode == 'skip':
+            self.log(f"    Skipping {len(repeated)} duplicate pages")
+            repeated = set(repeated)
+            return reader, [index for index in range(len(reader.pages)) if index not in repeated]
+        return reader, list(range(len(reader.pages)))
+    
+    def _log_duplicates(self, page_index: PageIndex = None) -> None:
+        """Reports the pages repeated across inputs, in runs of consecutive pages"""
+        if page_index is None:
+            return
+        self.last_stats['duplicate_pages'] = len(page_index.duplicates)
+        if not page_index.duplicates:
+            self.log(f"No duplicate pages among {page_index.pages} pages")
+            return
+        
+        action = 'skipped' if page_index.mode == 'skip' else 'merged'
+        self.log(f"Duplicate pages: {len(page_index.duplicates)} of {page_index.pages} ({action})")
+        for pdf_file, first, last, first_file, first_page in page_index.runs():
+            pages = f"page {first}" if first == last else f"pages {first}-{last}"
+            self.log(f"  {pdf_file} {pages} repeat {first_file} from page {first_page}")
+    
+    def _check_input(self, file, file_path: str, cache: PdfMetadataCache = None, prechecked: dict = None):
+        """
+        Checks that an input file can be read, using cached metadata of unchanged files
+        
+        Args:
+            prechecked: Metadata already found by the fast check, used as is
+        
+        Returns:
+            Tuple[dict, Optional[pypdf.PdfReader]]: Metadata with page count and error
+                message (None if readable), and the reader if the file had to be parsed
+        """
+        if prechecked is not None:
+            return prechecked, None
+        
+        metadata = cache.get(file_path) if cache is not None else None
+        if metadata is not None:
+            return metadata, None
+        
+        reader = None
+        try:
+            reader = pypdf.PdfReader(file)
+            metadata = read_pdf_metadata(reader)
         except Exception as e:
-            print(f"Error merging PDF: {str(e)}")
+            metadata = {'pages': 0, 'error': str(e)}
+        
+        if cache is not None:
+            cache.put(file_path, metadata)
+        return metadata, reader
+    
+    def _validate_inputs(self, input_dir: str, pdf_files: List[str], cache: PdfMetadataCache = None,
+                         workers: int = 8) -> Dict[str, dict]:
+        """
+        Checks all inputs concurrently with the fast structural check
+        
+        Returns:
+            Dict[str, dict]: Metadata by file name
+        """
+        results = {}
+        if cache is not None:
+            for pdf_file in pdf_files:
+                metadata = cache.get(os.path.join(input_dir, pdf_file))
+                if metadata is not None:
+                    results[pdf_file] = metadata
+        
+        unchecked = [pdf_file for pdf_file in pdf_files if pdf_file not in results]
+        started = time.perf_counter()
+        checked = validate_files([os.path.join(input_dir, pdf_file) for pdf_file in unchecked], workers)
+        full_parses = 0
+        for pdf_file, metadata in zip(unchecked, checked):
+            if metadata.pop('method') == 'full':
+                full_parses += 1
+                self.log(f"  Fast check failed for {pdf_file}: {metadata.pop('fast_error')}")
+            if cache is not None:
+                cache.put(os.path.join(input_dir, pdf_file), metadata)
+            results[pdf_file] = metadata
+        
+        self.log(f"Checked {len(unchecked)} files in {time.perf_counter() - started:.2f} s "
+                 f"({full_parses} needed a full parse)")
+        return results
+    
+    def validate_pdfs(self, input_dir: str, workers: int = 8) -> bool:
+        """
+        Checks every PDF file of a folder without merging
+        
+        Args:
+            input_dir: Path to folder with PDF files
+            workers: Number of threads used by the fast check
+            
+        Returns:
+            bool: True if all files are readable, False otherwise
+        """
+        self.last_stats = {}
+        if not os.path.isdir(input_dir):
+            self.log(f"Error: Folder {input_dir} not found")
             return False
+        
+        pdf_files = sorted(file for file in os.listdir(input_dir) if file.lower().endswith('.pdf'))
+        if not pdf_files:
+            self.log("Error: No PDF files found in folder")
+            return False
+        
+        results = self._validate_inputs(input_dir, pdf_files, workers=workers)
+        damaged = 0
+        for pdf_file in pdf_files:
+            metadata = results[pdf_file]
+            if metadata['error']:
+                damaged += 1
+                self.log(f"  {pdf_file}: damaged ({metadata['error']})")
+            else:
+                self.log(f"  {pdf_file}: {metadata['pages']} pages")
+        
+        self.last_stats = {'pages': sum(metadata['pages'] for metadata in results.values()),
+                           'files': len(pdf_files), 'bytes': 0, 'damaged': damaged}
+        self.log(f"{len(pdf_files) - damaged} of {len(pdf_files)} files are readable")
+        return damaged == 0
+    
+    def _finish_metrics(self, metrics: OperationMetrics, profiler=None, profile_file: str = None,
+                        trace_file: str = None) -> None:
+        """Completes the run metrics and saves the requested profile and trace files"""
+        try:
+            for written in finish_metrics(metrics, profiler, profile_file, trace_file):
+                if written == trace_file:
+                    self.log(f"Saved trace: {written}")
+                else:
+                    self.log(f"Saved profile: {written}")
+        except OSError as e:
+            self.log(f"Error saving profile or trace: {str(e)}")
+    
+    def _log_cache_summary(self, cache: PdfMetadataCache = None) -> None:
+        """Reports metadata cache hits and misses of the run"""
+        if cache is None:
+            return
+        self.last_stats.update({'cache_hits': cache.hits, 'cache_misses': cache.misses})
+        self.log(f"Metadata cache: {cache.hits} hits, {cache.misses} misses")
+    
+    def _merge_streaming(self, inputs, output_file: str,
+                         tracker: _ProgressTracker, cache: PdfMetadataCache = None,
+                         prechecked: Dict[str, dict] = None, metrics: OperationMetrics = None,
+                         atomic: bool = False, fsync: bool = False, page_index: PageIndex = None) -> int:
+        """
+        Merges files with the streaming writer, reading each input only once
+        
+        Args:
+            inputs: (name, path, binary file) tuples from _input_files
+            atomic: Write through a temporary name renamed into place when complete
+            fsync: Flush the output to disk before the rename
+            page_index: Index finding duplicate pages, None to merge without deduplication
+        
+        Returns:
+            int: Total number of pages in the merged file
+        """
+        with _open_output(output_file, atomic, fsync) as output:
+            try:
+                self._stream_inputs(inputs, _StreamingPdfWriter(TimedWriter(output)), tracker, cache,
+                                    prechecked, metrics, page_index)
+            except BaseException:
+                # A partly written file is not a PDF; atomic outputs drop their temporary file
+                if not (atomic or fsync):
+                    output.close()
+                    os.remove(output_file)
+                raise
+        return tracker.pages_done
+    
+    def _merge_parallel(self, input_dir: str, pdf_files: List[str], output_file: str, workers: int,
+                        tracker: _ProgressTracker, prechecked: Dict[str, dict] = None,
+                        metrics: OperationMetrics = None, atomic: bool = False, fsync: bool = False) -> int:
+        """
+        Merges contiguous groups of files concurrently and splices the results together
+        
+        Every group is written by a worker process as a fragment with its own object
+        numbers. Fragments are appended to the output in group order as soon as
+        they and all groups before them are done; appending only rewrites object
+        numbers, so the serial part is a copy and the pages keep the order of pdf_files.
+        
+        Returns:
+            int: Total number of pages in the merged file
+        """
+        prechecked = prechecked or {}
+        metrics = metrics or OperationMetrics('merge')
+        input_paths = []
+        for pdf_file in pdf_files:
+            metadata = prechecked.get(pdf_file)
+            if metadata is not None and metadata['error']:
+                self.log(f"    Error reading {pdf_file}: {metadata['error']}, skipping")
+                tracker.advance(files=1)
+                continue
+            input_paths.append(os.path.join(input_dir, pdf_file))
+        
+        groups = _merge_groups(input_paths, workers * MERGE_GROUPS_PER_WORKER)
+        self.log(f"  Merging {len(input_paths)} files in {len(groups)} groups on {workers} processes")
+        
+        # Fragments stay on the file system of the output
+        temp_dir = tempfile.mkdtemp(prefix='pdf_merge_', dir=os.path.dirname(os.path.abspath(output_file)))
+        fragment_paths = [os.path.join(temp_dir, f"{index}.part") for index in range(len(groups))]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor, \
+                    _open_output(output_file, atomic, fsync) as output:
+                futures = [executor.submit(_merge_group_worker, group, fragment_path)
+                           for group, fragment_path in zip(groups, fragment_paths)]
+                try:
+                    writer = _StreamingPdfWriter(TimedWriter(output))
+                    for index, (group, fragment_path, future) in enumerate(zip(groups, fragment_paths, futures)):
+                        tracker.check_cancelled()
+                        pages, skipped, fragment, timer = future.result()
+                        for pdf_file, error in skipped:
+                            if error:
+                                self.log(f"    Error reading {pdf_file}: {error}, skipping")
+                            else:
+                                self.log(f"    Warning: {pdf_file} contains no pages, skipping")
+                        
+                        with timer.phase('combine'):
+                            writer.append_fragment(fragment_path, fragment)
+                        os.remove(fragment_path)
+                        metrics.add_chunk(f"group {index + 1} ({len(group)} files)", pages, timer,
+                                          sum(os.path.getsize(input_path) for input_path in group))
+                        tracker.advance(pages, len(group))
+                    
+                    with metrics.phase('finish'):
+                        writer.finish()
+                except BaseException:
+                    # Pending groups are dropped and a partly written file removed
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    if not (atomic or fsync):
+                        output.close()
+                        os.remove(output_file)
+                    raise
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return tracker.pages_done
+    
+    def _stream_inputs(self, inputs, writer: _StreamingPdfWriter,
+                       tracker: _ProgressTracker, cache: PdfMetadataCache = None,
+                       prechecked: Dict[str, dict] = None, metrics: OperationMetrics = None,
+                       page_index: PageIndex = None) -> None:
+        """
+        Appends every readable (name, path, file) input to the streaming writer and finishes the output
+        
+        The writer's stream is a TimedWriter; the time spent in its write() calls is
+        reported as the write phase, the rest of appending as the append phase.
+        """
+        prechecked = prechecked or {}
+        metrics = metrics or OperationMetrics('merge')
+        for pdf_file, file_path, file, timer in _timed_inputs(inputs):
+            tracker.check_cancelled()
+            self.log(f"  Adding: {pdf_file}")
+            
+            # The same reader checks the file and provides its objects
+            with timer.phase('check'):
+                metadata, reader = self._check_input(file, file_path, cache, prechecked.get(pdf_file))
+            if metadata['error']:
+                self.log(f"    Error reading {pdf_file}: {metadata['error']}, skipping")
+                metrics.add_chunk(pdf_file, 0, timer)
+                tracker.advance(files=1)
+                continue
+            if metadata['pages'] == 0:
+                self.log(f"    Warning: {pdf_file} contains no pages, skipping")
+                metrics.add_chunk(pdf_file, 0, timer)
+                tracker.advance(files=1)
+                continue
+            
+            started_wall, started = time.time(), time.perf_counter()
+            write_seconds, start_offset = writer.stream.seconds, writer.stream.tell()
+            try:
+                skip = ()
+                if page_index is not None:
+                    reader, kept = self._dedup_input(page_index, pdf_file, file, reader, timer)
+                    skip = set(range(len(reader.pages))) - set(kept)
+                    started_wall, started = time.time(), time.perf_counter()
+                if reader is None:
+                    # Passed the cache or the fast check, parsed here for its objects only
+                    reader = pypdf.PdfReader(file)
+                pages = writer.append_reader(reader, skip)
+            except Exception as e:
+                # The fast check does not read the page tree, so a file it passed may still fail
+                self.log(f"    Error reading {pdf_file}: {e}, skipping")
+                metrics.add_chunk(pdf_file, 0, timer)
+                tracker.advance(files=1)
+                continue
+            write_seconds = writer.stream.seconds - write_seconds
+            append_seconds = time.perf_counter() - started - write_seconds
+            timer.add('append', started_wall, append_seconds)
+            timer.add('write', started_wall + append_seconds, write_seconds)
+            timer.count('write', bytes_count=writer.stream.tell() - start_offset)
+            metrics.add_chunk(pdf_file, pages, timer, file.seek(0, os.SEEK_END))
+            tracker.advance(pages, 1)
+            del reader
+        
+        with metrics.phase('finish'):
+            writer.finish()
+
+
+# Manifest columns that hold numbers or flags
+JOB_INT_FIELDS = ('pages', 'workers', 'max_bytes', 'prefetch', 'prefetch_mb', 'optimize_level')
+JOB_BOOL_FIELDS = ('share_resources', 'memory_map', 'streaming', 'by_bookmarks', 'use_cache', 'fast_check',
+                   'allow_gaps', 'atomic', 'fsync', 'resume', 'incremental')
+
+
+def _log_to_stderr(message: str) -> None:
+    """Prints an operation message to stderr"""
+    print(message, file=sys.stderr)
+
+
+# Parsed readers shared by the jobs run in this process (batch files, job server workers)
+_job_reader_cache = None
+
+
+def run_job(job: dict, progress_callback=None, cancel_event=None) -> dict:
+    """
+    Runs one split or merge job and summarizes the result
+    
+    Args:
+        job: Job description with 'operation' ('split', 'merge', 'extract' or 'validate'), 'input' and
+             optional 'output', 'pages', 'workers' and mode flags
+        progress_callback: Function receiving progress dicts of the operation
+        cancel_event: Event stopping the operation once set
+        
+    Returns:
+        dict: Summary with success flag, page count, bytes written (and before optimization,
+            None if not optimized), metadata cache hits and misses (None without the cache),
+            output path, elapsed time and seconds, bytes and objects per phase
+    """
+    # Human-readable messages go to stderr, stdout is kept for summary lines
+    global _job_reader_cache
+    if _job_reader_cache is None:
+        _job_reader_cache = ReaderCache()
+    splitter = PDFSplitter(log=_log_to_stderr, reader_cache=_job_reader_cache)
+    operation = job.get('operation')
+    started = time.perf_counter()
+    
+    try:
+        # Bad manifest lines fail their own job only, the batch goes on
+        if job.get('manifest_error'):
+            raise ValueError(job['manifest_error'])
+        if not job.get('input'):
+            raise ValueError("Job has no input")
+        if operation == 'split':
+            # Only a missing count means the default, 0 is an error like any other count below 1
+            pages = int(job['pages']) if job.get('pages') not in (None, '') else 10
+            if pages <= 0:
+                raise ValueError(f"Pages per file must be a positive number, got {pages}")
+            success = splitter.split_pdf(job['input'], pages,
+                                         workers=int(job.get('workers') or 1),
+                                         share_resources=bool(job.get('share_resources')),
+                                         memory_map=bool(job.get('memory_map')),
+                                         output_dir=job.get('output') or None,
+                                         incremental=bool(job.get('incremental')),
+                                         ranges=job.get('ranges') or None,
+                                         by_bookmarks=bool(job.get('by_bookmarks')),
+                                         max_bytes=int(job.get('max_bytes') or 0) or None,
+                                         progress_callback=progress_callback, cancel_event=cancel_event,
+                                         archive=job.get('archive') or None,
+                                         profile_file=job.get('profile_file') or None,
+                                         trace_file=job.get('trace_file') or None,
+                                         optimize=job.get('optimize') or None,
+                                         optimize_level=int(job.get('optimize_level') or DEFAULT_LEVEL),
+                                         atomic=bool(job.get('atomic')), fsync=bool(job.get('fsync')),
+                                         resume=bool(job.get('resume')))
+        elif operation == 'merge':
+            success = splitter.merge_pdfs(job['input'], job.get('output') or None,
+                                          streaming=bool(job.get('streaming')),
+                                          use_cache=bool(job.get('use_cache')),
+                                          fast_check=bool(job.get('fast_check')),
+                                          prefetch=int(job.get('prefetch') or 0),
+                                          prefetch_max_bytes=int(job.get('prefetch_mb') or 256) * 1024 * 1024,
+                                          progress_callback=progress_callback, cancel_event=cancel_event,
+                                          profile_file=job.get('profile_file') or None,
+                                          trace_file=job.get('trace_file') or None,
+                                          optimize=job.get('optimize') or None,
+                                          optimize_level=int(job.get('optimize_level') or DEFAULT_LEVEL),
+                                          workers=int(job.get('workers') or 1),
+                                          order=job.get('order') or 'auto',
+                                          manifest_file=job.get('manifest') or None,
+                                          allow_gaps=bool(job.get('allow_gaps')),
+                                          atomic=bool(job.get('atomic')), fsync=bool(job.get('fsync')),
+                                          dedup=job.get('dedup') or None,
+                                          files=job.get('files') or None)
+        elif operation == 'extract':
+            success = splitter.extract(job['input'], job.get('ranges') or '', job.get('output') or None)
+        elif operation == 'validate':
+            success = splitter.validate_pdfs(job['input'], workers=int(job.get('workers') or 8))
+        else:
+            splitter.log(f"Error: Unknown operation {operation!r}")
+            success = False
+    except Exception as e:
+        splitter.log(f"Error: {str(e)}")
+        success = False
+    
+    return {
+        'operation': operation,
+        'input': job.get('input'),
+        'success': success,
+        'pages': splitter.last_stats.get('pages', 0),
+        'files': splitter.last_stats.get('files', 0),
+        'bytes': splitter.last_stats.get('bytes', 0),
+        'bytes_before': splitter.last_stats.get('bytes_before'),
+        'duplicate_pages': splitter.last_stats.get('duplicate_pages'),
+        'cache_hits': splitter.last_stats.get('cache_hits'),
+        'cache_misses': splitter.last_stats.get('cache_misses'),
+        'output': splitter.last_stats.get('output'),
+        'elapsed': round(time.perf_counter() - started, 3),
+        'phases': splitter.last_metrics.to_dict()['phases'] if splitter.last_metrics else {},
+    }
+
+
+def run_tree_batch(root: str, operation: str = 'split', output_root: str = None,
+                   include=DEFAULT_INCLUDE, exclude=(), workers: int = 1, journal_file: str = None,
+                   options: dict = None, summary_callback=None) -> List[dict]:
+    """
+    Splits every PDF file, or merges every folder of PDF files, of a directory tree
+    
+    Inputs are found with os.scandir and scheduled on a process pool largest
+    first, so that big files do not start last and leave a long tail; each
+    worker takes the next input as soon as it is free. Finished inputs are
+    written to a journal, and a later run with the same journal skips inputs
+    that were finished and have not changed since.
+    
+    Args:
+        root: Top folder of the tree
+        operation: 'split' (one job per file) or 'merge' (one job per folder with files)
+        output_root: Folder receiving the outputs in the layout of the tree
+                     (defaults to "<root>_<operation>" next to root)
+        include: Glob patterns of input files, matched against the relative path or the name
+        exclude: Glob patterns of files and folders to leave out
+        workers: Number of jobs run at once
+        journal_file: Journal of finished inputs (defaults to batch-journal.jsonl in output_root)
+        options: Further job fields, e.g. {'pages': 20} or {'optimize': 'all'}
+        summary_callback: Function receiving the summary of every finished job
+        
+    Returns:
+        List[dict]: Summaries of the jobs run, in the order they finished
+    
+    Raises:
+        ValueError: If the operation is not 'split' or 'merge'
+    """
+    root_path = Path(root)
+    output_root = Path(output_root) if output_root else root_path.parent / f"{root_path.name}_{operation}"
+    items = discover_inputs(root, operation, include, exclude, skip_dirs=[output_root])
+    journal = BatchJournal(journal_file or output_root / JOURNAL_NAME)
+    pending = sorted((item for item in items if not journal.is_done(item)),
+                     key=lambda item: item['size'], reverse=True)
+    _log_to_stderr(f"Found {len(items)} inputs, {len(items) - len(pending)} already done by an earlier run")
+    
+    jobs = []
+    for item in pending:
+        output_path = tree_output_path(output_root, root, item, operation)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        job = dict(options or {}, operation=operation, input=item['path'], output=str(output_path))
+        if operation == 'merge':
+            # The folder is merged as selected by include and exclude, not as listed by the merge
+            job['files'] = item['names']
+        jobs.append(job)
+    
+    summaries = []
+    
+    def finished(item: dict, summary: dict) -> None:
+        journal.record(item, summary)
+        summaries.append(summary)
+        if summary_callback is not None:
+            summary_callback(summary)
+    
+    try:
+        if workers <= 1:
+            for item, job in zip(pending, jobs):
+                finished(item, run_job(job))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # A few jobs per worker are queued at a time, keeping the largest-first order
+                queued = iter(zip(pending, jobs))
+                running = {}
+                for item, job in queued:
+                    running[executor.submit(run_job, job)] = item
+                    if len(running) >= workers * 2:
+                        break
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished(running.pop(future), future.result())
+                        for item, job in queued:
+                            running[executor.submit(run_job, job)] = item
+                            break
+    finally:
+        journal.close()
+    return summaries
+
+
+def load_manifest(manifest_file: str) -> List[dict]:
+    """
+    Reads jobs from a JSONL file (one object per line) or a CSV file with a header row
+    
+    A line that is not valid JSON or has a field that is not a number where one
+    is expected becomes a job with a 'manifest_error', which run_job reports
+    as failed, so the other jobs of the batch still run.
+    
+    Args:
+        manifest_file: Path to the manifest
+        
+    Returns:
+        List[dict]: Job descriptions in file order
+    
+    Raises:
+        OSError: If the manifest cannot be read
+        ValueError: If the manifest is not UTF-8 text
+    """
+    with open(manifest_file, 'r', encoding='utf-8', newline='') as file:
+        if manifest_file.lower().endswith('.csv'):
+            # Line 1 is the header row
+            lines = [(number, dict(row)) for number, row in enumerate(csv.DictReader(file), 2)]
+        else:
+            lines = [(number, line) for number, line in enumerate(file, 1) if line.strip()]
+    
+    jobs = []
+    for number, job in lines:
+        try:
+            if isinstance(job, str):
+                job = json.loads(job)
+                if not isinstance(job, dict):
+                    raise ValueError("expected a JSON object")
+            for field in JOB_INT_FIELDS:
+                if job.get(field) not in (None, ''):
+                    job[field] = int(job[field])
+            for field in JOB_BOOL_FIELDS:
+                if isinstance(job.get(field), str):
+                    job[field] = job[field].strip().lower() in ('1', 'true', 'yes')
+        except (TypeError, ValueError) as e:
+            # Operation and input are kept for the summary where the line has them
+            job = dict({key: job.get(key) for key in ('operation', 'input')} if isinstance(job, dict) else {},
+                       manifest_error=f"Manifest line {number}: {str(e)}")
+        jobs.append(job)
+    return jobs
+
+
+def _positive_int(value: str) -> int:
+    """Parses a command line count that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {number}")
+    return number
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Creates the parser of the non-interactive command line"""
+    parser = argparse.ArgumentParser(description="Utility for splitting and merging PDF files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    split_parser = subparsers.add_parser('split', help="Split a PDF file")
+    split_parser.add_argument('input', help="Path to the source PDF file")
+    split_parser.add_argument('-p', '--pages', type=_positive_int, default=10, help="Number of pages in each file")
+    split_parser.add_argument('-o', '--output-dir', help="Folder for output files")
+    split_parser.add_argument('-w', '--workers', type=int, default=1, help="Number of worker processes")
+    split_parser.add_argument('--share-resources', action='store_true',
+                              help="Write shared fonts and images once per file")
+    split_parser.add_argument('--memory-map', action='store_true', help="Read the source through mmap")
+    split_parser.add_argument('--ranges', help='Explicit page ranges of output files, e.g. "1-3,7,10-end"')
+    split_parser.add_argument('--bookmarks', action='store_true', help="Start a new file at every top-level bookmark")
+    split_parser.add_argument('--max-bytes', type=int, help="Target maximum size of each output file in bytes")
+    split_parser.add_argument('--resume', action='store_true',
+                              help="Skip files an interrupted run of the same split already wrote (implies --atomic)")
+    split_parser.add_argument('--incremental', action='store_true',
+                              help="Rewrite only files whose pages changed since the last split into the folder")
+    split_parser.add_argument('--archive',
+                              help="Write files into a .zip/.tar/.tar.gz archive, or a tar stream to stdout with -")
+    
+    merge_parser = subparsers.add_parser('merge', help="Merge PDF files from a folder")
+    merge_parser.add_argument('input', help="Path to folder with PDF files or a ZIP/tar archive of them")
+    merge_parser.add_argument('-o', '--output', help="Path to output file")
+    merge_parser.add_argument('--streaming', action='store_true', help="Use the streaming merge (pages only, no bookmarks, forms or document info)")
+    merge_parser.add_argument('-w', '--workers', type=int, default=1,
+                              help="Number of worker processes merging groups of files in parallel")
+    merge_parser.add_argument('--order', choices=MERGE_ORDERS, default='auto',
+                              help="Merge order: page ranges in names, natural name order, modification time "
+                                   "or manifest (auto: ranges if every name has one, natural otherwise)")
+    merge_parser.add_argument('--manifest', help="Text file listing the files to merge, one name per line")
+    merge_parser.add_argument('--allow-gaps', action='store_true',
+                              help="Merge page-range files even if pages are missing between them")
+    merge_parser.add_argument('--dedup', choices=DEDUP_MODES,
+                              help="Report pages repeated across inputs, or skip them in the merged file")
+    merge_parser.add_argument('--cache', action='store_true', help="Cache input metadata next to the folder")
+    merge_parser.add_argument('--fast-check', action='store_true',
+                              help="Check inputs from their trailer and xref table only")
+    merge_parser.add_argument('--prefetch', type=int, default=0,
+                              help="Number of following inputs read ahead on threads")
+    merge_parser.add_argument('--prefetch-mb', type=int, default=256,
+                              help="Memory ceiling of inputs read ahead in MB")
+    
+    for operation_parser in (split_parser, merge_parser):
+        operation_parser.add_argument('--profile', help="Save cProfile statistics of the run to this file")
+        operation_parser.add_argument('--trace', help="Save phase timings as a Chrome trace JSON file")
+        operation_parser.add_argument('--optimize',
+                                      help='Optimize output files: comma-separated "flate", "objstm", '
+                                           '"orphans" or "all"')
+        operation_parser.add_argument('--level', type=int, default=DEFAULT_LEVEL, choices=range(1, 10),
+                                      metavar='1-9', help="Optimization speed (1) versus size (9)")
+        operation_parser.add_argument('--atomic', action='store_true',
+                                      help="Write files under a temporary name, renamed when complete")
+        operation_parser.add_argument('--fsync', action='store_true',
+                                      help="Flush files to disk before renaming them (implies --atomic)")
+    
+    extract_parser = subparsers.add_parser('extract', help="Write selected pages into one file")
+    extract_parser.add_argument('input', help="Path to the source PDF file")
+    extract_parser.add_argument('-r', '--ranges', required=True, help='Pages to extract, e.g. "4001-4010,4020"')
+    extract_parser.add_argument('-o', '--output', help="Path to output file")
+    
+    validate_parser = subparsers.add_parser('validate', help="Check PDF files of a folder for damage")
+    validate_parser.add_argument('input', help="Path to folder with PDF files")
+    validate_parser.add_argument('-w', '--workers', type=int, default=8, help="Number of threads")
+    
+    batch_parser = subparsers.add_parser('batch', help="Run split/merge jobs from a JSONL or CSV manifest")
+    batch_parser.add_argument('manifest', help="Path to the manifest file")
+    batch_parser.add_argument('-w', '--workers', type=int, default=1, help="Number of jobs run at once")
+    
+    tree_parser = subparsers.add_parser('tree', help="Split every PDF file or merge every folder of a tree")
+    tree_parser.add_argument('root', help="Top folder of the tree")
+    tree_parser.add_argument('--operation', choices=TREE_OPERATIONS, default='split',
+                             help="split each file, or merge the files of each folder")
+    tree_parser.add_argument('-o', '--output-root', help="Folder for outputs, mirroring the tree")
+    tree_parser.add_argument('--include', action='append',
+                             help='Glob pattern of input files, may be repeated (default "*.pdf")')
+    tree_parser.add_argument('--exclude', action='append', default=[],
+                             help="Glob pattern of files or folders to skip, may be repeated")
+    tree_parser.add_argument('-p', '--pages', type=_positive_int, default=10, help="Number of pages in each split file")
+    tree_parser.add_argument('-w', '--workers', type=int, default=1, help="Number of jobs run at once")
+    tree_parser.add_argument('--journal', help="Journal of finished inputs for resuming an interrupted run")
+    
+    return parser
+
+
+def run_cli(argv: List[str]) -> int:
+    """
+    Runs the non-interactive command line
+    
+    Prints one JSON summary line per job to stdout, or to stderr when a split
+    streams its archive to stdout.
+    
+    Returns:
+        int: Exit code, 0 if all jobs succeeded
+    """
+    args = build_arg_parser().parse_args(argv)
+    
+    if args.command == 'tree':
+        summaries = run_tree_batch(args.root, args.operation, args.output_root,
+                                   args.include or DEFAULT_INCLUDE, args.exclude, args.workers, args.journal,
+                                   {'pages': args.pages} if args.operation == 'split' else {},
+                                   lambda summary: print(json.dumps(summary), flush=True))
+        return 0 if all(summary['success'] for summary in summaries) else 1
+    
+    if args.command == 'split':
+        jobs = [{'operation': 'split', 'input': args.input, 'pages': args.pages,
+                 'output': args.output_dir, 'workers': args.workers,
+                 'share_resources': args.share_resources, 'memory_map': args.memory_map,
+                 'ranges': args.ranges, 'by_bookmarks': args.bookmarks, 'max_bytes': args.max_bytes,
+                 'archive': args.archive, 'profile_file': args.profile, 'trace_file': args.trace,
+                 'optimize': args.optimize, 'optimize_level': args.level,
+                 'atomic': args.atomic, 'fsync': args.fsync, 'resume': args.resume,
+                 'incremental': args.incremental}]
+        workers = 1
+    elif args.command == 'merge':
+        jobs = [{'operation': 'merge', 'input': args.input, 'output': args.output,
+                 'streaming': args.streaming, 'use_cache': args.cache, 'fast_check': args.fast_check,
+                 'workers': args.workers, 'order': args.order, 'manifest': args.manifest,
+                 'allow_gaps': args.allow_gaps, 'dedup': args.dedup,
+                 'prefetch': args.prefetch, 'prefetch_mb': args.prefetch_mb,
+                 'profile_file': args.profile, 'trace_file': args.trace,
+                 'optimize': args.optimize, 'optimize_level': args.level,
+                 'atomic': args.atomic, 'fsync': args.fsync}]
+        workers = 1
+    elif args.command == 'extract':
+        jobs = [{'operation': 'extract', 'input': args.input, 'ranges': args.ranges, 'output': args.output}]
+        workers = 1
+    elif args.command == 'validate':
+        jobs = [{'operation': 'validate', 'input': args.input, 'workers': args.workers}]
+        workers = 1
+    else:
+        try:
+            jobs = load_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            print(f"Error reading manifest {args.manifest}: {str(e)}", file=sys.stderr)
+            return 2
+        workers = args.workers
+    
+    summary_stream = sys.stderr if any(job.get('archive') == '-' for job in jobs) else sys.stdout
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(run_job, jobs)
+            summaries = []
+            for summary in results:
+                print(json.dumps(summary), file=summary_stream, flush=True)
+                summaries.append(summary)
+    else:
+        summaries = []
+        for job in jobs:
+            summary = run_job(job)
+            print(json.dumps(summary), file=summary_stream, flush=True)
+            summaries.append(summary)
+    
+    return 0 if all(summary['success'] for summary in summaries) else 1
 
 
 def main():
@@ -229,5 +2624,7 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     main()
 
@@ -5,17 +5,20 @@ PDF Splitter GUI Utility
 Graphical interface for splitting and merging PDF files
 """
 
-import os
-import sys
-import re
+import queue
 import threading
-from pathlib import Path
-from typing import List, Tuple
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import PyPDF2
-from PyPDF2 import PdfReader, PdfWriter
-import pypdf
+
+from pdf_splitter import PDFSplitter
+
+
+# How often queued log lines and UI updates are delivered, in milliseconds
+EVENT_POLL_INTERVAL_MS = 100
+# Maximum number of queued events handled in one delivery
+MAX_EVENTS_PER_BATCH = 5000
+# Number of lines kept in the operation log
+LOG_MAX_LINES = 2000
 
 
 class PDFSplitterGUI:
@@ -31,7 +34,15 @@ class PDFSplitterGUI:
         self.style = ttk.Style()
         self.style.theme_use('clam')
         
+        # Worker threads never touch widgets, they post log lines and UI calls here
+        self.events = queue.Queue()
+        
+        # Core operations, their messages go to the log panel
+        self.splitter = PDFSplitter(log=self.log_message)
+        self.cancel_event = threading.Event()
+        
         self.setup_ui()
+        self.root.after(EVENT_POLL_INTERVAL_MS, self.process_events)
     
     def setup_ui(self):
         """Create user interface"""
@@ -93,9 +104,17 @@ class PDFSplitterGUI:
                                      command=self.split_pdf_threaded)
         self.split_button.grid(row=4, column=0, pady=(10, 0))
         
+        # Cancel button
+        self.split_cancel_button = ttk.Button(self.split_frame, text="Cancel", 
+                                            command=self.cancel_operation, state='disabled')
+        self.split_cancel_button.grid(row=4, column=1, sticky=tk.W, padx=(5, 0), pady=(10, 0))
+        
         # Progress bar for splitting
-        self.split_progress = ttk.Progressbar(self.split_frame, mode='indeterminate')
+        self.split_progress = ttk.Progressbar(self.split_frame, mode='determinate', maximum=100)
         self.split_progress.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        self.split_status_var = tk.StringVar()
+        ttk.Label(self.split_frame, textvariable=self.split_status_var).grid(row=6, column=0, columnspan=3, sticky=tk.W)
     
     def setup_merge_tab(self):
         """Setup merge tab"""
@@ -125,9 +144,17 @@ class PDFSplitterGUI:
                                      command=self.merge_pdfs_threaded)
         self.merge_button.grid(row=4, column=0, pady=(10, 0))
         
+        # Cancel button
+        self.merge_cancel_button = ttk.Button(self.merge_frame, text="Cancel", 
+                                            command=self.cancel_operation, state='disabled')
+        self.merge_cancel_button.grid(row=4, column=1, sticky=tk.W, padx=(5, 0), pady=(10, 0))
+        
         # Progress bar for merging
-        self.merge_progress = ttk.Progressbar(self.merge_frame, mode='indeterminate')
+        self.merge_progress = ttk.Progressbar(self.merge_frame, mode='determinate', maximum=100)
         self.merge_progress.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        self.merge_status_var = tk.StringVar()
+        ttk.Label(self.merge_frame, textvariable=self.merge_status_var).grid(row=6, column=0, columnspan=3, sticky=tk.W)
     
     def setup_log_panel(self, parent):
         """Setup log panel"""
@@ -144,10 +171,53 @@ class PDFSplitterGUI:
                   command=self.clear_log).grid(row=4, column=0, sticky=tk.W)
     
     def log_message(self, message):
-        """Add message to log"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """Add message to log (safe to call from any thread)"""
+        self.events.put((None, message))
+    
+    def post(self, func, *args):
+        """Schedule a call on the Tk main loop (safe to call from any thread)"""
+        self.events.put((func, args))
+    
+    def process_events(self):
+        """Deliver queued log lines and UI calls in one batch"""
+        try:
+            self._deliver_events()
+        finally:
+            # A failing call must not stop later events from being delivered
+            self.root.after(EVENT_POLL_INTERVAL_MS, self.process_events)
+    
+    def _deliver_events(self):
+        lines = []
+        progress = {}
+        calls = []
+        try:
+            for _ in range(MAX_EVENTS_PER_BATCH):
+                func, args = self.events.get_nowait()
+                if func is None:
+                    lines.append(args)
+                elif func == self.show_progress:
+                    # Only the latest progress of each bar is worth drawing
+                    progress[args[0]] = args
+                else:
+                    calls.append((func, args))
+        except queue.Empty:
+            pass
+        
+        if lines:
+            self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+            
+            # Keep only the last lines so memory and redraw cost stay bounded
+            line_count = int(self.log_text.index('end-1c').split('.')[0])
+            if line_count > LOG_MAX_LINES:
+                self.log_text.delete('1.0', f"{line_count - LOG_MAX_LINES}.0")
+            self.log_text.see(tk.END)
+        
+        # Calls already taken from the queue still run if one of them fails
+        for func, args in [(self.show_progress, args) for args in progress.values()] + calls:
+            try:
+                func(*args)
+            except Exception as e:
+                self.log_message(f"Error updating the window: {str(e)}")
     
     def clear_log(self):
         """Clear log"""
@@ -192,72 +262,69 @@ class PDFSplitterGUI:
             messagebox.showerror("Error", "Enter a valid number of pages")
             return
         
+        input_file = self.split_file_var.get()
+        self.start_operation(self.split_cancel_button, self.split_progress, self.split_status_var)
+        
         # Start in separate thread
-        thread = threading.Thread(target=self.split_pdf)
+        thread = threading.Thread(target=self.split_pdf, args=(input_file, pages_per_file))
         thread.daemon = True
         thread.start()
     
-    def split_pdf(self):
-        """Split PDF file"""
+    def start_operation(self, cancel_button, progress_bar, status_var):
+        """Prepare widgets of a tab for a new operation"""
+        self.cancel_event.clear()
+        progress_bar['value'] = 0
+        status_var.set("")
+        # One operation at a time: both tabs share the splitter and the cancel event
+        for button in (self.split_button, self.merge_button):
+            button.config(state='disabled')
+        cancel_button.config(state='normal')
+    
+    def finish_operation(self, cancel_button):
+        """Restore widgets of a tab after an operation"""
+        for button in (self.split_button, self.merge_button):
+            button.config(state='normal')
+        cancel_button.config(state='disabled')
+    
+    def cancel_operation(self):
+        """Request cancellation of the running operation"""
+        self.cancel_event.set()
+        self.log_message("Cancelling...")
+    
+    def show_progress(self, progress_bar, status_var, progress):
+        """Show progress reported by PDFSplitter"""
+        progress_bar['value'] = progress['fraction'] * 100
+        
+        status = (f"{progress['files_done']}/{progress['total_files']} files, "
+                  f"{progress['pages_done']} pages, "
+                  f"{progress['bytes_written'] / (1024 * 1024):.1f} MB, "
+                  f"{progress['pages_per_sec']:.0f} pages/s")
+        if progress['eta'] is not None:
+            status += f", ETA {progress['eta']:.0f} s"
+        status_var.set(status)
+    
+    def split_pdf(self, input_file, pages_per_file):
+        """Split PDF file (runs in a worker thread)"""
         try:
-            self.split_progress.start()
-            self.split_button.config(state='disabled')
-            
-            input_file = self.split_file_var.get()
-            pages_per_file = int(self.pages_per_file_var.get())
-            
             self.log_message(f"Starting to split file: {input_file}")
             
-            # Check if file exists
-            if not os.path.exists(input_file):
-                self.log_message("Error: File not found")
-                return
+            success = self.splitter.split_pdf(
+                input_file, pages_per_file,
+                progress_callback=lambda progress: self.post(self.show_progress, self.split_progress,
+                                                             self.split_status_var, progress),
+                cancel_event=self.cancel_event)
             
-            # Create folder name for output files
-            input_path = Path(input_file)
-            output_dir = input_path.parent / input_path.stem
-            output_dir.mkdir(exist_ok=True)
-            
-            # Open PDF file
-            with open(input_file, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                
-                self.log_message(f"Source file contains {total_pages} pages")
-                self.log_message(f"Creating files with {pages_per_file} pages each in folder: {output_dir}")
-                
-                # Split into files
-                file_count = 0
-                for start_page in range(0, total_pages, pages_per_file):
-                    end_page = min(start_page + pages_per_file, total_pages)
-                    file_count += 1
-                    
-                    # Create new PDF writer
-                    pdf_writer = PdfWriter()
-                    
-                    # Add pages to writer
-                    for page_num in range(start_page, end_page):
-                        pdf_writer.add_page(pdf_reader.pages[page_num])
-                    
-                    # Form output filename
-                    output_filename = f"{start_page + 1}-{end_page}.pdf"
-                    output_path = output_dir / output_filename
-                    
-                    # Save file
-                    with open(output_path, 'wb') as output_file:
-                        pdf_writer.write(output_file)
-                    
-                    self.log_message(f"Created file: {output_filename} (pages {start_page + 1}-{end_page})")
-                
-                self.log_message(f"Splitting completed! Created {file_count} files in folder: {output_dir}")
-                messagebox.showinfo("Success", f"PDF successfully split into {file_count} files!")
+            if success:
+                self.post(messagebox.showinfo, "Success",
+                          f"PDF successfully split into {self.splitter.last_stats['files']} files!")
+            elif not self.cancel_event.is_set():
+                self.post(messagebox.showerror, "Error", "Error splitting PDF, see the operation log for details")
                 
         except Exception as e:
             self.log_message(f"Error splitting PDF: {str(e)}")
-            messagebox.showerror("Error", f"Error splitting PDF: {str(e)}")
+            self.post(messagebox.showerror, "Error", f"Error splitting PDF: {str(e)}")
         finally:
-            self.split_progress.stop()
-            self.split_button.config(state='normal')
+            self.post(self.finish_operation, self.split_cancel_button)
     
     def merge_pdfs_threaded(self):
         """Start merging in separate thread"""
@@ -265,110 +332,36 @@ class PDFSplitterGUI:
             messagebox.showerror("Error", "Select a folder with PDF files")
             return
         
+        input_dir = self.merge_dir_var.get()
+        output_file = self.merge_output_var.get() or None
+        self.start_operation(self.merge_cancel_button, self.merge_progress, self.merge_status_var)
+        
         # Start in separate thread
-        thread = threading.Thread(target=self.merge_pdfs)
+        thread = threading.Thread(target=self.merge_pdfs, args=(input_dir, output_file))
         thread.daemon = True
         thread.start()
     
-    def merge_pdfs(self):
-        """Merge PDF files"""
+    def merge_pdfs(self, input_dir, output_file):
+        """Merge PDF files (runs in a worker thread)"""
         try:
-            self.merge_progress.start()
-            self.merge_button.config(state='disabled')
-            
-            input_dir = self.merge_dir_var.get()
-            output_file = self.merge_output_var.get()
-            
             self.log_message(f"Starting to merge files from folder: {input_dir}")
             
-            # Check if folder exists
-            if not os.path.exists(input_dir):
-                self.log_message("Error: Folder not found")
-                return
-            
-            # Get list of PDF files and sort them
-            pdf_files = []
-            for file in os.listdir(input_dir):
-                if file.lower().endswith('.pdf'):
-                    pdf_files.append(file)
-            
-            if not pdf_files:
-                self.log_message("Error: No PDF files found in folder")
-                return
+            success = self.splitter.merge_pdfs(
+                input_dir, output_file,
+                progress_callback=lambda progress: self.post(self.show_progress, self.merge_progress,
+                                                             self.merge_status_var, progress),
+                cancel_event=self.cancel_event)
             
-            # Sort files by page numbers
-            def extract_page_numbers(filename):
-                """Extracts page numbers from filename for sorting"""
-                # Look for pattern: digits-digits at the beginning of filename
-                match = re.match(r'^(\d+)-(\d+)', filename)
-                if match:
-                    return int(match.group(1))  # Return first number for sorting
-                return 0
-            
-            pdf_files.sort(key=extract_page_numbers)
-            
-            self.log_message(f"Found PDF files (in merge order):")
-            for i, pdf_file in enumerate(pdf_files, 1):
-                match = re.match(r'^(\d+)-(\d+)', pdf_file)
-                if match:
-                    start_page = match.group(1)
-                    end_page = match.group(2)
-                    self.log_message(f"  {i}. {pdf_file} (pages {start_page}-{end_page})")
-                else:
-                    self.log_message(f"  {i}. {pdf_file} (order not determined)")
-            
-            # Create output filename if not specified
-            if not output_file:
-                input_path = Path(input_dir)
-                output_file = input_path.parent / f"{input_path.name}_merged.pdf"
-            
-            self.log_message(f"Merging {len(pdf_files)} files:")
-            
-            # Use pypdf for more reliable merging
-            merger = pypdf.PdfMerger()
-            
-            try:
-                for pdf_file in pdf_files:
-                    file_path = os.path.join(input_dir, pdf_file)
-                    self.log_message(f"  Adding: {pdf_file}")
-                    
-                    # Open file and add to merger
-                    with open(file_path, 'rb') as file:
-                        # Check that file is not corrupted
-                        try:
-                            test_reader = pypdf.PdfReader(file)
-                            if len(test_reader.pages) == 0:
-                                self.log_message(f"    Warning: {pdf_file} contains no pages, skipping")
-                                continue
-                        except Exception as e:
-                            self.log_message(f"    Error reading {pdf_file}: {str(e)}, skipping")
-                            continue
-                        
-                        # Return to beginning of file
-                        file.seek(0)
-                        merger.append(file)
-                
-                # Save merged file
-                with open(output_file, 'wb') as output:
-                    merger.write(output)
-                
-                total_pages = len(merger.pages)
-                
-                self.log_message(f"Merging completed!")
-                self.log_message(f"Created file: {output_file}")
-                self.log_message(f"Total number of pages: {total_pages}")
-                messagebox.showinfo("Success", f"PDF files successfully merged into {output_file}!")
-                
-            finally:
-                # Important to close merger to free resources
-                merger.close()
+            if success:
+                self.post(messagebox.showinfo, "Success", "PDF files successfully merged!")
+            elif not self.cancel_event.is_set():
+                self.post(messagebox.showerror, "Error", "Error merging PDF, see the operation log for details")
             
         except Exception as e:
             self.log_message(f"Error merging PDF: {str(e)}")
-            messagebox.showerror("Error", f"Error merging PDF: {str(e)}")
+            self.post(messagebox.showerror, "Error", f"Error merging PDF: {str(e)}")
         finally:
-            self.merge_progress.stop()
-            self.merge_button.config(state='normal')
+            self.post(self.finish_operation, self.merge_cancel_button)
 
 
 def main():
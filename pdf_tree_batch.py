@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Tree Batch
+Discovery of split and merge inputs in a directory tree and the journal of a batch run
+"""
+
+import os
+import json
+import fnmatch
+from pathlib import Path
+from typing import Iterable, List
+
+
+# Operations a tree batch runs per input
+TREE_OPERATIONS = ('split', 'merge')
+# Files picked up when no include pattern is given
+DEFAULT_INCLUDE = ('*.pdf',)
+# Journal file name inside the output folder
+JOURNAL_NAME = 'batch-journal.jsonl'
+
+
+def _matches(relative: str, name: str, patterns: Iterable[str]) -> bool:
+    """Matches a relative path or a bare name against glob patterns, ignoring case"""
+    relative, name = relative.lower(), name.lower()
+    return any(fnmatch.fnmatchcase(relative, pattern.lower()) or fnmatch.fnmatchcase(name, pattern.lower())
+               for pattern in patterns)
+
+
+def discover_files(root: str, include: Iterable[str] = DEFAULT_INCLUDE, exclude: Iterable[str] = (),
+                   skip_dirs: Iterable[str] = ()) -> List[dict]:
+    """
+    Walks a directory tree with os.scandir and collects the files matching the patterns
+    
+    Patterns match the path relative to root (with "/" separators) or the bare
+    name; excluded directories are not entered. Sizes and modification times
+    come from the directory entries, so no file is opened.
+    
+    Args:
+        root: Top folder of the tree
+        include: Glob patterns of files to collect
+        exclude: Glob patterns of files and folders to leave out
+        skip_dirs: Folders not to enter, such as the output folder
+    
+    Returns:
+        List[dict]: Files with 'path', 'relative', 'size' and 'mtime_ns', in walk order
+    """
+    include, exclude = list(include) or list(DEFAULT_INCLUDE), list(exclude)
+    skip_dirs = {os.path.abspath(skip_dir) for skip_dir in skip_dirs}
+    files = []
+    pending = [(root, '')]
+    while pending:
+        folder, prefix = pending.pop()
+        try:
+            with os.scandir(folder) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subfolders = []
+        for entry in entries:
+            relative = f"{prefix}{entry.name}"
+            if _matches(relative, entry.name, exclude):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if os.path.abspath(entry.path) not in skip_dirs:
+                    subfolders.append((entry.path, f"{relative}/"))
+            elif entry.is_file() and _matches(relative, entry.name, include):
+                stat = entry.stat()
+                files.append({'path': entry.path, 'relative': relative,
+                              'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+        # Popped from the end, so reversed to walk folders in name order
+        pending.extend(reversed(subfolders))
+    return files
+
+
+def discover_inputs(root: str, operation: str, include: Iterable[str] = DEFAULT_INCLUDE,
+                    exclude: Iterable[str] = (), skip_dirs: Iterable[str] = ()) -> List[dict]:
+    """
+    Collects the inputs of a tree batch: every file for split, every folder with files for merge
+    
+    Returns:
+        List[dict]: Inputs with 'path', 'relative', 'size' (total for folders),
+            'mtime_ns' (latest for folders) and 'files'; folders also have the
+            'names' of their selected files
+    
+    Raises:
+        ValueError: If the operation is not one of TREE_OPERATIONS
+    """
+    if operation not in TREE_OPERATIONS:
+        raise ValueError(f"Unknown tree operation {operation!r} (expected {', '.join(TREE_OPERATIONS)})")
+    
+    files = discover_files(root, include, exclude, skip_dirs)
+    if operation == 'split':
+        return [dict(file, files=1) for file in files]
+    
+    folders = {}
+    for file in files:
+        relative = os.path.dirname(file['relative']) or '.'
+        folder = folders.setdefault(relative, {'path': os.path.dirname(file['path']), 'relative': relative,
+                                               'size': 0, 'mtime_ns': 0, 'files': 0, 'names': []})
+        folder['size'] += file['size']
+        folder['mtime_ns'] = max(folder['mtime_ns'], file['mtime_ns'])
+        folder['files'] += 1
+        folder['names'].append(os.path.basename(file['path']))
+    return list(folders.values())
+
+
+def tree_output_path(output_root: str, root: str, item: dict, operation: str) -> Path:
+    """
+    Maps an input to its output under output_root, mirroring the tree
+    
+    A split of "a/b.pdf" goes to the folder "a/b", a merge of the folder "a/b" to "a/b.pdf".
+    """
+    output_root = Path(output_root)
+    if operation == 'split':
+        return output_root / Path(item['relative']).with_suffix('')
+    if item['relative'] == '.':
+        return output_root / f"{Path(root).resolve().name}.pdf"
+    return output_root / f"{item['relative']}.pdf"
+
+
+class BatchJournal:
+    """
+    Append-only JSONL record of the inputs a tree batch has finished
+    
+    An input counts as done if the journal has a successful entry with the same
+    relative path, size and modification time, so changed inputs are processed
+    again and failed ones are retried. Every line is flushed when written, so
+    an interrupted run loses at most the inputs that were in progress.
+    """
+    
+    def __init__(self, journal_file: str):
+        self.journal_file = str(journal_file)
+        self.done = set()
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut off by the interruption
+                        continue
+                    if entry.get('success'):
+                        self.done.add(self._key(entry))
+        self.file = None
+    
+    @staticmethod
+    def _key(item: dict) -> tuple:
+        return item.get('relative'), item.get('size'), item.get('mtime_ns')
+    
+    def is_done(self, item: dict) -> bool:
+        """Tells whether an input was finished by an earlier run"""
+        return self._key(item) in self.done
+    
+    def record(self, item: dict, summary: dict) -> None:
+        """Appends the result of an input"""
+        if self.file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_file)), exist_ok=True)
+            self.file = open(self.journal_file, 'a', encoding='utf-8')
+            if self.file.tell() and not self._ends_with_newline():
+                # Keep a line cut off by an interruption apart from the next entry
+                self.file.write("\n")
+        entry = {'relative': item['relative'], 'size': item['size'], 'mtime_ns': item['mtime_ns'],
+                 'success': summary.get('success', False), 'output': summary.get('output'),
+                 'elapsed': summary.get('elapsed')}
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        if entry['success']:
+            self.done.add(self._key(item))
+    
+    def _ends_with_newline(self) -> bool:
+        with open(self.journal_file, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+    
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF Validator
+Fast structural check of PDF files from their header, trailer and xref table
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import pypdf
+
+
+# Bytes read from the end of a file to find startxref and the trailer
+TAIL_BYTES = 4096
+# Bytes read at an object offset to find its dictionary entries
+OBJECT_BYTES = 4096
+# Size of one entry of a classic xref table
+XREF_ENTRY_BYTES = 20
+
+
+class StructureError(Exception):
+    """Raised when the fast check cannot confirm the structure of a file"""
+
+
+def _read_at(file, offset: int, length: int) -> bytes:
+    """Reads bytes at an absolute offset"""
+    file.seek(offset)
+    return file.read(length)
+
+
+def _reference(data: bytes, key: bytes) -> Optional[int]:
+    """Finds the object number of an indirect reference entry like /Root 1 0 R"""
+    match = re.search(re.escape(key) + rb'\s+(\d+)\s+\d+\s+R', data)
+    return int(match.group(1)) if match else None
+
+
+def _lookup_offset(file, xref_offset: int, idnum: int) -> int:
+    """
+    Finds the offset of an object in classic xref tables, following /Prev sections
+    
+    Raises:
+        StructureError: If the object is not found in the tables
+    """
+    visited = set()
+    while xref_offset is not None and xref_offset not in visited:
+        visited.add(xref_offset)
+        position = xref_offset + len(b'xref')
+        while True:
+            header = _read_at(file, position, 64)
+            match = re.match(rb'\s*(\d+)\s+(\d+)[ \t]*(\r\n|\r|\n)', header)
+            if not match:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            position += match.end()
+            if first <= idnum < first + count:
+                entry = _read_at(file, position + (idnum - first) * XREF_ENTRY_BYTES, XREF_ENTRY_BYTES)
+                entry_match = re.match(rb'(\d{10}) (\d{5}) ([nf])', entry)
+                if not entry_match:
+                    raise StructureError(f"damaged xref entry of object {idnum}")
+                if entry_match.group(3) == b'n':
+                    return int(entry_match.group(1))
+                break
+            position += count * XREF_ENTRY_BYTES
+        
+        # Continue with the previous section of an incrementally updated file
+        trailer = _read_at(file, position, TAIL_BYTES)
+        if not trailer.lstrip().startswith(b'trailer'):
+            trailer_start = trailer.find(b'trailer')
+            if trailer_start < 0:
+                raise StructureError("trailer not found after xref table")
+            trailer = trailer[trailer_start:]
+        match = re.search(rb'/Prev\s+(\d+)', trailer)
+        xref_offset = int(match.group(1)) if match else None
+    
+    raise StructureError(f"object {idnum} not found in xref table")
+
+
+def _object_body(file, offset: int, idnum: int, size: int) -> bytes:
+    """Reads the start of an object and checks its header"""
+    if not 0 < offset < size:
+        raise StructureError(f"object {idnum} points outside of the file")
+    data = _read_at(file, offset, OBJECT_BYTES)
+    match = re.match(rb'\s*(\d+)\s+(\d+)\s+obj', data)
+    if not match or int(match.group(1)) != idnum:
+        raise StructureError(f"object {idnum} not found at its xref offset")
+    return data[match.end():]
+
+
+def quick_check(file_path: str) -> dict:
+    """
+    Checks header, startxref, xref table, trailer and page tree /Count of a file
+    
+    Only the header, the tail and a few objects are read; no page content is loaded.
+    Files with cross-reference streams (PDF 1.5+) get their xref and page tree
+    root resolved through pypdf, still without touching pages.
+    
+    Returns:
+        dict: Metadata with page count, PDF version and encryption flag
+    
+    Raises:
+        StructureError: If the file is truncated or damaged
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as file:
+        header = _read_at(file, 0, 1024)
+        version_match = re.search(rb'%PDF-(\d\.\d)', header)
+        if not version_match:
+            raise StructureError("PDF header not found")
+        
+        tail = _read_at(file, max(size - TAIL_BYTES, 0), TAIL_BYTES)
+        if b'%%EOF' not in tail:
+            raise StructureError("%%EOF marker not found, file is probably truncated")
+        startxref = tail.rfind(b'startxref')
+        match = re.match(rb'startxref\s+(\d+)', tail[startxref:]) if startxref >= 0 else None
+        if not match:
+            raise StructureError("startxref not found")
+        xref_offset = int(match.group(1))
+        if not 0 < xref_offset < size:
+            raise StructureError("startxref points outside of the file")
+        
+        xref = _read_at(file, xref_offset, 64)
+        if xref.startswith(b'xref'):
+            trailer_start = tail.rfind(b'trailer', 0, startxref)
+            if trailer_start < 0:
+                raise StructureError("trailer not found")
+            trailer = tail[trailer_start:startxref]
+            root = _reference(trailer, b'/Root')
+            if root is None:
+                raise StructureError("trailer has no /Root")
+            catalog = _object_body(file, _lookup_offset(file, xref_offset, root), root, size)
+            pages = _reference(catalog, b'/Pages')
+            if pages is None:
+                raise StructureError("catalog has no /Pages")
+            page_tree = _object_body(file, _lookup_offset(file, xref_offset, pages), pages, size)
+            count = re.search(rb'/Count\s+(\d+)', page_tree)
+            if not count:
+                raise StructureError("page tree has no /Count")
+            page_count = int(count.group(1))
+            encrypted = b'/Encrypt' in trailer
+        elif re.match(rb'\s*\d+\s+\d+\s+obj', xref):
+            # Cross-reference stream: pypdf decodes it without loading pages
+            file.seek(0)
+            try:
+                reader = pypdf.PdfReader(file, strict=True)
+                page_count = int(reader.trailer['/Root']['/Pages']['/Count'])
+                encrypted = bool(reader.is_encrypted)
+            except Exception as e:
+                raise StructureError(f"damaged cross-reference stream: {str(e)}")
+        else:
+            raise StructureError("startxref does not point to an xref section")
+    
+    return {
+        'pages': page_count,
+        'version': f"%PDF-{version_match.group(1).decode()}",
+        'encrypted': encrypted,
+        'error': None,
+    }
+
+
+def validate_file(file_path: str) -> dict:
+    """
+    Validates a file with the fast check, falling back to a full parse if it fails
+    
+    Returns:
+        dict: Metadata with 'pages', 'error' (None if valid), 'method' ('fast' or 'full')
+            and 'fast_error' with the reason the fast check failed
+    """
+    try:
+        metadata = quick_check(file_path)
+        metadata['method'] = 'fast'
+        return metadata
+    except (StructureError, OSError) as e:
+        fast_error = str(e)
+    
+    try:
+        with open(file_path, 'rb') as file:
+            reader = pypdf.PdfReader(file)
+            metadata = {
+                'pages': len(reader.pages),
+                'version': reader.pdf_header,
+                'encrypted': bool(reader.is_encrypted),
+                'error': None,
+            }
+    except Exception as e:
+        metadata = {'pages': 0, 'error': str(e)}
+    metadata.update({'method': 'full', 'fast_error': fast_error})
+    return metadata
+
+
+def validate_files(file_paths: List[str], workers: int = 8) -> List[dict]:
+    """
+    Validates files concurrently
+    
+    Returns:
+        List[dict]: Results of validate_file in the order of file_paths
+    """
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        return list(executor.map(validate_file, file_paths))